@@ -1,3 +1,4 @@
+import timeit
 from typing import Annotated
 
 import anyio
@@ -7,7 +8,12 @@ from authlib.integrations import httpx_client
 from rich.pretty import pprint
 
 from jellbrid.cli.base import AsyncTyper
-from jellbrid.clients.realdebrid import RealDebridClient, TorrentStatus
+from jellbrid.clients.realdebrid import RDBundleManager, RealDebridClient, TorrentStatus
+from jellbrid.clients.realdebrid.filters import (
+    episode_filter,
+    filter_extension,
+    filter_samples,
+)
 from jellbrid.config import Config
 from jellbrid.storage import (
     ActiveDownloadRepo,
@@ -120,3 +126,97 @@ async def get_new_tokens(
         },
     ).json()
     print(tokens)
+
+
+def _baseline_filters(season_id: int, episode_id: int) -> list:
+    """The bundle filters as they were before being compiled into a regex"""
+    season_ = f"{season_id}".zfill(2)
+    episode_ = f"{episode_id}".zfill(2)
+    names = [
+        f"s{season_id}e{episode_id}",
+        f"s{season_id}.e{episode_id}",
+        f"s{season_}e{episode_}",
+        f"s{season_}.e{episode_}",
+    ]
+
+    def episode_filter(filename: str) -> bool:
+        filename = filename.lower()
+        return any(name in filename for name in names)
+
+    def filter_samples(filename: str) -> bool:
+        return "sample" not in filename.lower()
+
+    def filter_extension(filename: str) -> bool:
+        filename = filename.lower()
+        return (
+            filename.endswith("mp4")
+            or filename.endswith("mkv")
+            or filename.endswith("avi")
+            or filename.endswith("mpg")
+        )
+
+    return [episode_filter, filter_samples, filter_extension]
+
+
+@app.command()
+def bench_bundles(
+    seasons: Annotated[int, typer.Option("--seasons", "-s")] = 30,
+    episodes: Annotated[int, typer.Option("--episodes", "-e")] = 100,
+    rounds: Annotated[int, typer.Option("--rounds", "-r")] = 20,
+    baseline: Annotated[bool, typer.Option("--baseline", "-b")] = False,
+):
+    """
+    Benchmarks selecting an episode from a complete series pack, the way the
+    downloader does: find a bundle with a match, then read its files. With
+    --baseline, the previous path is timed on the same files to compare with,
+    which calls each filter in turn and filters every file again for each of
+    the bundle's properties
+    """
+    files = []
+    for season in range(1, seasons + 1):
+        for episode in range(1, episodes + 1):
+            name = f"Show.Name.S{season:02}E{episode:02}.1080p.WEB.x264"
+            files.append({"id": len(files) + 1, "path": f"/Season {season}/{name}.mkv"})
+            files.append({"id": len(files) + 1, "path": f"/Season {season}/{name}.nfo"})
+        files.append({"id": len(files) + 1, "path": f"/Season {season}/sample.mkv"})
+    data = {"files": files}
+
+    file_filters = [episode_filter(seasons, 1), filter_samples, filter_extension]
+
+    def select():
+        manager = RDBundleManager(data, file_filters=file_filters)
+        bundle = manager.get_bundle_with_match()
+        assert bundle is not None
+        return bundle.size, bundle.file_ids, bundle.filenames
+
+    baseline_filters = _baseline_filters(seasons, 1)
+
+    def select_baseline():
+        def matching(property: str) -> list:
+            found = []
+            for file in files:
+                for filter in baseline_filters:
+                    if not filter(file["path"]):
+                        break
+                else:
+                    found.append(file[property])
+            return found
+
+        # the bundle's matches, then its size, file ids and filenames
+        assert len(matching("id")) > 0
+        return len(matching("path")), matching("id"), matching("path")
+
+    elapsed = timeit.timeit(select, number=rounds)
+    results = {
+        "n_files": len(files),
+        "ms_per_selection": round(elapsed / rounds * 1000, 3),
+        "us_per_file": round(elapsed / rounds / len(files) * 1_000_000, 3),
+    }
+    if baseline:
+        assert select_baseline() == select(), "the baseline selected other files"
+        baseline_elapsed = timeit.timeit(select_baseline, number=rounds)
+        results |= {
+            "baseline_ms_per_selection": round(baseline_elapsed / rounds * 1000, 3),
+            "speedup": round(baseline_elapsed / elapsed, 2),
+        }
+    pprint(results)
@@ -1,8 +1,12 @@
+import functools
+
+import anyio
 from rich.pretty import pprint
 
 from jellbrid.cli.base import AsyncTyper
-from jellbrid.clients.seers import SeerrsClient, parse_request
+from jellbrid.clients.seers import SeerrsClient, parse_requests
 from jellbrid.config import Config
+from jellbrid.requests import MediaRequest
 
 app = AsyncTyper()
 
@@ -22,8 +26,10 @@ async def show_requests():
     jc = JellyfinClient(cfg)
 
     reqs = []
-    for request in await sc.get_processing_requests():
-        for req in await parse_request(sc, jc, request, ignore_partials=False):
+    send, receive = anyio.create_memory_object_stream[MediaRequest]()
+    async with anyio.create_task_group() as tg, receive:
+        tg.start_soon(functools.partial(parse_requests, sc, jc, send))
+        async for req in receive:
             reqs.append(req)
     pprint(reqs)
 
@@ -1,3 +1,6 @@
+import datetime
+import email.utils
+import importlib.util
 import json
 import logging
 import urllib.parse
@@ -6,26 +9,131 @@ import httpx
 import structlog
 import tenacity
 
+from jellbrid.clients.circuitbreaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+)
+from jellbrid.clients.ratelimit import RateLimiter
+from jellbrid.clients.singleflight import SingleFlight
+from jellbrid.config import HttpSettings
+
 logger = structlog.get_logger(__name__)
-client = httpx.AsyncClient(timeout=10.0)
+
+
+def create_http_client(settings: HttpSettings) -> httpx.AsyncClient:
+    http2 = settings.http2
+    # h2 comes with the httpx[http2] dependency, but may be missing from other
+    # installs
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 needs the h2 package, falling back to HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry_s,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.connect_timeout_s,
+            read=settings.read_timeout_s,
+            write=settings.write_timeout_s,
+            pool=settings.pool_timeout_s,
+        ),
+    )
+
+
+class RetryableResponseError(Exception):
+    """A rate limited or server error response, which is worth retrying"""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"{response.status_code} from {response.request.url}")
+        self.response = response
+        self.retry_after_s = parse_retry_after(response.headers.get("Retry-After"))
+
+
+# what an upstream that is down or failing raises, once retries have run out
+UPSTREAM_UNAVAILABLE_ERRORS = (
+    CircuitOpenError,
+    RetryableResponseError,
+    httpx.HTTPError,
+)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Reads a Retry-After header, which is either a number of seconds or a date"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.datetime.now(tz=retry_at.tzinfo or datetime.UTC)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+class wait_retry_after(tenacity.wait.wait_base):
+    """
+    Waits for as long as the upstream asked with a Retry-After header, up to a
+    maximum, and otherwise for as long as the fallback wait
+    """
+
+    def __init__(self, fallback: tenacity.wait.wait_base, *, max_s: float):
+        self.fallback = fallback
+        self.max_s = max_s
+
+    def __call__(self, retry_state: tenacity.RetryCallState) -> float:
+        error = retry_state.outcome.exception() if retry_state.outcome else None
+        if (
+            isinstance(error, RetryableResponseError)
+            and error.retry_after_s is not None
+        ):
+            return min(error.retry_after_s, self.max_s)
+        return self.fallback(retry_state)
+
+
+class stop_when_circuit_open(tenacity.stop.stop_base):
+    """Stops retrying once the upstream has failed enough to open its circuit"""
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+
+    def __call__(self, retry_state: tenacity.RetryCallState) -> bool:
+        return self.breaker.state == CircuitState.OPEN
 
 
 class BaseClient:
-    def __init__(self, url: str, headers: dict | None = None):
+    def __init__(
+        self,
+        url: str,
+        headers: dict | None = None,
+        *,
+        rate_limiter: RateLimiter | None = None,
+        http: HttpSettings | None = None,
+    ):
         self.base_url = url
         headers = headers or {}
         self.base_headers = {
             "Accept": "application/json",
             "Content-Type": "application/json",
         } | headers
-        self.client = client
+        # each upstream has its own connection pool, retries and circuit breaker
+        self.http = http or HttpSettings()
+        self.client = create_http_client(self.http)
+        self.breaker = CircuitBreaker(
+            urllib.parse.urlsplit(url).netloc,
+            failure_threshold=self.http.failure_threshold,
+            reset_timeout_s=self.http.reset_timeout_s,
+        )
+        self.rate_limiter = rate_limiter
+        self.single_flight = SingleFlight()
 
-    @tenacity.retry(
-        stop=tenacity.stop_after_attempt(5),
-        wait=tenacity.wait.wait_exponential_jitter(),
-        before_sleep=tenacity.before_sleep_log(logger, logging.WARNING),
-        reraise=True,
-    )
     async def request(
         self,
         method: str,
@@ -34,6 +142,75 @@ class BaseClient:
         json_: dict | None = None,
         data: dict | None = None,
         headers: dict | None = None,
+    ) -> dict:
+        """
+        Identical GET requests that are made while one is already in flight share
+        its response, rather than each making their own request
+        """
+        if method.upper() != "GET":
+            return await self._request(method, path, params, json_, data, headers)
+
+        key = (path, json.dumps(params, sort_keys=True, default=str), str(headers))
+        return await self.single_flight.do(
+            key, lambda: self._request(method, path, params, json_, data, headers)
+        )
+
+    async def warmup(self):
+        """
+        Opens a connection to the upstream ahead of the first request, so that
+        it doesn't wait on the connection and TLS handshake. The connection is
+        kept in the pool for reuse, whatever the response
+        """
+        try:
+            await self.client.request("HEAD", self.base_url)
+        except httpx.HTTPError as e:
+            logger.warning(
+                "Unable to warm up connection", url=self.base_url, error=repr(e)
+            )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        json_: dict | None = None,
+        data: dict | None = None,
+        headers: dict | None = None,
+    ) -> dict:
+        """
+        Retries rate limited requests, server errors and connection errors, with
+        exponential backoff unless the upstream says how long to wait. Requests
+        stop being retried once the upstream's circuit opens, and aren't made
+        at all while it's open
+        """
+        retrying = tenacity.AsyncRetrying(
+            stop=(
+                tenacity.stop_after_attempt(self.http.max_attempts)
+                | stop_when_circuit_open(self.breaker)
+            ),
+            wait=wait_retry_after(
+                tenacity.wait.wait_exponential_jitter(),
+                max_s=self.http.max_retry_after_s,
+            ),
+            retry=tenacity.retry_if_not_exception_type(CircuitOpenError),
+            before_sleep=tenacity.before_sleep_log(logger, logging.WARNING),
+            reraise=True,
+        )
+        return await retrying(
+            self._attempt_request, method, path, params, json_, data, headers
+        )
+
+    async def _attempt_request(
+        self,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        json_: dict | None = None,
+        data: dict | None = None,
+        headers: dict | None = None,
     ) -> dict:
         if path.startswith("/"):
             logger.warning("Path will overwrite base path for request", path=path)
@@ -42,22 +219,31 @@ class BaseClient:
         headers.update(self.base_headers)
 
         url = urllib.parse.urljoin(self.base_url, path)
-        response = await self.client.request(
-            method, url, headers=headers, params=params, json=json_, data=data
-        )
+        self.breaker.before_request()
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(method)
+            response = await self.client.request(
+                method, url, headers=headers, params=params, json=json_, data=data
+            )
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_cancelled()
+            raise
 
         logger.debug(f"{method} {response.request.url}", response=response.status_code)
-        if response.status_code == 429:
-            logger.warning(
-                "Request was rate limited. Performing a retry with exponential backoff",
-                error=response.json(),
-            )
-            raise tenacity.TryAgain
         if response.status_code >= 500:
-            logger.warning(
-                "Encountered server error. Performing a retry with exponential backoff",
-            )
-            raise tenacity.TryAgain
+            self.breaker.record_failure()
+            logger.warning("Encountered server error", response=response.status_code)
+            raise RetryableResponseError(response)
+
+        # the upstream is up, even when it's rate limiting us
+        self.breaker.record_success()
+        if response.status_code == 429:
+            logger.warning("Request was rate limited", error=response.text)
+            raise RetryableResponseError(response)
 
         try:
             return response.json()
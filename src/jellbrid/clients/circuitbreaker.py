@@ -0,0 +1,101 @@
+import enum
+import time
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class CircuitState(enum.StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a request to a host that is down"""
+
+    def __init__(self, host: str, retry_in_s: float):
+        super().__init__(f"{host} is unavailable, retrying in {retry_in_s:.0f}s")
+        self.host = host
+        self.retry_in_s = retry_in_s
+
+
+class CircuitBreaker:
+    """
+    Fails requests to a host fast while it is down. After enough failures in a
+    row the circuit opens, and requests fail without being made. Once the reset
+    timeout has passed, the circuit is half-open and a single request is let
+    through to probe the host. If it succeeds the circuit closes again,
+    otherwise it stays open for another reset timeout.
+    """
+
+    def __init__(
+        self, host: str, *, failure_threshold: int = 5, reset_timeout_s: float = 30.0
+    ):
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_s = reset_timeout_s
+
+        self.state = CircuitState.CLOSED
+        self.n_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+        self.n_opened = 0
+        self.n_rejected = 0
+
+    def before_request(self):
+        if self.state == CircuitState.CLOSED:
+            return
+
+        if self.state == CircuitState.OPEN:
+            retry_in_s = self.opened_at + self.reset_timeout_s - time.monotonic()
+            if retry_in_s > 0:
+                self.n_rejected += 1
+                raise CircuitOpenError(self.host, retry_in_s)
+            logger.info("Probing host", host=self.host)
+            self.state = CircuitState.HALF_OPEN
+            self.probing = False
+
+        # only the one probe is let through while half-open
+        if self.probing:
+            self.n_rejected += 1
+            raise CircuitOpenError(self.host, self.reset_timeout_s)
+        self.probing = True
+
+    def record_success(self):
+        if self.state != CircuitState.CLOSED:
+            logger.info("Host has recovered", host=self.host)
+        self.state = CircuitState.CLOSED
+        self.n_failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.n_failures += 1
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.n_failures >= self.failure_threshold
+        ):
+            if self.state != CircuitState.OPEN:
+                self.n_opened += 1
+                logger.warning(
+                    "Host is unavailable, failing requests to it",
+                    host=self.host,
+                    failures=self.n_failures,
+                    reset_timeout_s=self.reset_timeout_s,
+                )
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+    def record_cancelled(self):
+        """Lets another request probe the host, when a probe didn't finish"""
+        self.probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": str(self.state),
+            "opened": self.n_opened,
+            "rejected": self.n_rejected,
+        }
@@ -0,0 +1,169 @@
+import collections
+import json
+import math
+import time
+
+import anyio
+import structlog
+
+from jellbrid.clients.base import BaseClient
+from jellbrid.clients.singleflight import SingleFlight
+
+logger = structlog.get_logger(__name__)
+
+
+class LatencyTracker:
+    """Keeps a window of recent latencies to take percentiles from"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: collections.deque[float] = collections.deque(maxlen=window)
+
+    def record(self, latency_s: float):
+        self.latencies.append(latency_s)
+
+    def percentile(self, p: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, math.ceil(p * len(ordered)) - 1)
+        return ordered[max(0, index)]
+
+
+class HedgedClient:
+    """
+    Makes GET requests against a list of equivalent upstreams. A request goes
+    to the first (primary) upstream, and if it hasn't answered within the
+    percentile of the primary's recent latencies, the request is also made
+    against the next upstream, and so on. The first response wins and the
+    other requests are cancelled. An upstream that fails has the next one
+    started straight away. Other methods only go to the primary.
+    """
+
+    def __init__(
+        self,
+        clients: list[BaseClient],
+        *,
+        percentile: float = 0.95,
+        # the hedge delay used until there are enough latencies to go by
+        initial_delay_s: float = 2.0,
+        min_delay_s: float = 0.1,
+        min_samples: int = 10,
+    ):
+        if not clients:
+            raise ValueError("HedgedClient needs at least one client")
+        self.clients = clients
+        self.percentile = percentile
+        self.initial_delay_s = initial_delay_s
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self.latency = LatencyTracker()
+        self.single_flight = SingleFlight()
+
+        self.n_requests = 0
+        self.n_hedged = 0
+        self.wins = [0] * len(clients)
+
+    async def warmup(self):
+        async with anyio.create_task_group() as tg:
+            for client in self.clients:
+                tg.start_soon(client.warmup)
+
+    async def aclose(self):
+        for client in self.clients:
+            await client.aclose()
+
+    def hedge_delay(self) -> float:
+        if len(self.latency.latencies) < self.min_samples:
+            return self.initial_delay_s
+        delay = self.latency.percentile(self.percentile) or self.initial_delay_s
+        return max(self.min_delay_s, delay)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        json_: dict | None = None,
+        data: dict | None = None,
+        headers: dict | None = None,
+    ) -> dict:
+        if method.upper() != "GET":
+            return await self.clients[0].request(
+                method, path, params, json_, data, headers
+            )
+
+        # GETs are coalesced here even without upstreams to hedge against, so
+        # that the coalescing stats cover every request
+        key = (path, json.dumps(params, sort_keys=True, default=str), str(headers))
+        if len(self.clients) == 1:
+            return await self.single_flight.do(
+                key,
+                lambda: self.clients[0].request(method, path, params, headers=headers),
+            )
+        return await self.single_flight.do(
+            key, lambda: self._hedged_request(method, path, params, headers)
+        )
+
+    async def _hedged_request(
+        self, method: str, path: str, params: dict | None, headers: dict | None
+    ) -> dict:
+        self.n_requests += 1
+        results: list[dict] = []
+        errors: list[Exception] = []
+        in_flight = 0
+        all_failed = anyio.Event()
+
+        async def attempt(i: int, client: BaseClient, cancel_scope: anyio.CancelScope):
+            nonlocal in_flight
+            start = time.perf_counter()
+            try:
+                # copy the headers, since the client adds its own to them
+                headers_ = dict(headers) if headers else None
+                result = await client.request(method, path, params, headers=headers_)
+            except anyio.get_cancelled_exc_class():
+                # a primary that lost to a hedge took at least this long, and
+                # leaving it out would skew the percentile low
+                if i == 0:
+                    self.latency.record(time.perf_counter() - start)
+                raise
+            except Exception as e:
+                logger.warning("Hedged request failed", upstream=i, error=repr(e))
+                errors.append(e)
+                in_flight -= 1
+                if in_flight == 0:
+                    all_failed.set()
+                return
+
+            if i == 0:
+                self.latency.record(time.perf_counter() - start)
+            self.wins[i] += 1
+            results.append(result)
+            cancel_scope.cancel()
+
+        async with anyio.create_task_group() as tg:
+            for i, client in enumerate(self.clients):
+                if i > 0:
+                    self.n_hedged += 1
+                    logger.debug("Hedging request", upstream=i, path=path)
+
+                in_flight += 1
+                all_failed = anyio.Event()
+                tg.start_soon(attempt, i, client, tg.cancel_scope)
+
+                if i < len(self.clients) - 1:
+                    # hedge when the upstreams in flight are slow, or have failed
+                    with anyio.move_on_after(self.hedge_delay()):
+                        await all_failed.wait()
+
+        if results:
+            return results[0]
+        raise errors[0]
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.n_requests,
+            "hedged": self.n_hedged,
+            "wins": self.wins,
+            "hedge_delay_s": round(self.hedge_delay(), 3),
+            "circuits": [str(client.breaker.state) for client in self.clients],
+        }
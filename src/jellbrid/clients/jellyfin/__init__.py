@@ -1,8 +1,9 @@
 from .client import JellyfinClient
 from .services import scan_and_wait_for_completion
-from .types import Task, TaskState
+from .types import EpisodeEntry, Task, TaskState
 
 __all__ = (
+    "EpisodeEntry",
     "JellyfinClient",
     "Task",
     "TaskState",
@@ -1,9 +1,10 @@
 import typing as t
 
 import structlog
+from cachetools import TTLCache
 
 from jellbrid.clients.base import BaseClient
-from jellbrid.clients.jellyfin.types import Task
+from jellbrid.clients.jellyfin.types import EpisodeEntry, Task
 from jellbrid.config import Config
 
 logger = structlog.get_logger(__name__)
@@ -12,9 +13,18 @@ logger = structlog.get_logger(__name__)
 class JellyfinClient:
     def __init__(self, cfg: Config):
         self.client = BaseClient(
-            cfg.jf_url, {"Authorization": f"MediaBrowser Token={cfg.jf_api_key}"}
+            cfg.jf_url,
+            {"Authorization": f"MediaBrowser Token={cfg.jf_api_key}"},
+            http=cfg.jf_http,
         )
         self.cfg = cfg
+        self.scan_task_id: str | None = None
+        # the episodes of each series, by media id. The episodes in the library
+        # change when it's scanned, which invalidates this. The TTL catches
+        # scans that jellbrid didn't start, and changes made by hand
+        self.episode_index: TTLCache[str, list[EpisodeEntry]] = TTLCache(
+            maxsize=500, ttl=cfg.jf_episode_index_ttl_s
+        )
 
     async def get_system_info(self):
         return await self.client.request("GET", "System/Info")
@@ -22,6 +32,17 @@ class JellyfinClient:
     async def refresh_library(self):
         await self.client.request("POST", "Library/Refresh")
 
+    async def refresh_item(self, item_id: str):
+        """Refreshes a single item, e.g. a library, and everything beneath it"""
+        params = {
+            "Recursive": "true",
+            "MetadataRefreshMode": "Default",
+            "ImageRefreshMode": "Default",
+            "ReplaceAllMetadata": "false",
+            "ReplaceAllImages": "false",
+        }
+        await self.client.request("POST", f"Items/{item_id}/Refresh", params=params)
+
     async def get_scheduled_tasks(self) -> list[Task]:
         result = await self.client.request("GET", "ScheduledTasks")
         return t.cast(list[Task], result)
@@ -31,9 +52,17 @@ class JellyfinClient:
         return t.cast(Task, result)
 
     async def get_media_scan_task(self) -> Task | None:
+        # the task's id doesn't change, so it's only looked up once
+        if self.scan_task_id is not None:
+            task = await self.get_task_by_id(self.scan_task_id)
+            if task and "Id" in task:
+                return task
+            self.scan_task_id = None
+
         tasks = await self.get_scheduled_tasks()
         for task in tasks:
             if task["Name"] == "Scan Media Library":
+                self.scan_task_id = task["Id"]
                 return task
         return None
 
@@ -45,3 +74,36 @@ class JellyfinClient:
             "GET", f"Shows/{media_id}/Episodes", params=params
         )
         return result["Items"]
+
+    async def get_episode_index(self, media_id: str) -> list[EpisodeEntry]:
+        """
+        Returns the season, number and name of every episode in a series. All of
+        the series' episodes are listed with a single request, without any of the
+        optional fields, and are cached until the library is next scanned or
+        JF_EPISODE_INDEX_TTL_S has passed
+        """
+        index = self.episode_index.get(media_id, None)
+        if index is not None:
+            return index
+
+        params = {"enableImages": "false", "enableUserData": "false", "fields": ""}
+        result = await self.client.request(
+            "GET", f"Shows/{media_id}/Episodes", params=params
+        )
+        index = [
+            EpisodeEntry(
+                season=e.get("ParentIndexNumber"),
+                episode=e.get("IndexNumber"),
+                name=e["Name"],
+            )
+            for e in result["Items"]
+        ]
+        self.episode_index[media_id] = index
+        return index
+
+    async def get_episode_names_in_season(self, media_id: str, season: int) -> set[str]:
+        index = await self.get_episode_index(media_id)
+        return {e.name for e in index if e.season == season}
+
+    def invalidate_episode_index(self):
+        self.episode_index.clear()
@@ -1,17 +1,69 @@
+import time
+
 import anyio
+import structlog
 
 from jellbrid.clients.jellyfin.client import JellyfinClient
 from jellbrid.clients.jellyfin.types import TaskState
 
+logger = structlog.get_logger(__name__)
+
+MIN_POLL_INTERVAL_S = 1.0
+
+
+def next_poll_interval(
+    progress: tuple[float, float] | None,
+    previous: tuple[float, float] | None,
+    max_interval: float,
+) -> float:
+    """
+    Estimates when a task will finish from how quickly its progress (a pair of
+    time and percentage) has moved since the previous poll, and polls again
+    about half way to then. Until there's an estimate, the task is polled
+    again soon.
+    """
+    if progress is None or previous is None:
+        return min(max_interval, 5.0)
+
+    (t1, p1), (t0, p0) = progress, previous
+    if p1 <= p0 or t1 <= t0:
+        return max_interval
+
+    remaining_s = (100 - p1) / ((p1 - p0) / (t1 - t0))
+    return max(MIN_POLL_INTERVAL_S, min(max_interval, remaining_s / 2))
+
 
 async def scan_and_wait_for_completion(jfc: JellyfinClient, *, interval: int = 30):
-    await jfc.refresh_library()
+    """
+    Refreshes the libraries that downloads go to, when they're configured, or
+    scans every library and waits for the scan to complete. The scan is polled
+    at most every interval seconds, and more often as it nears completion.
+    """
+    if jfc.cfg.jf_library_ids:
+        for library_id in jfc.cfg.jf_library_ids:
+            await jfc.refresh_item(library_id)
+        # refreshing an item doesn't run a scheduled task that could be polled
+        await anyio.sleep(jfc.cfg.jf_refresh_settle_s)
+    else:
+        await jfc.refresh_library()
+        await wait_for_media_scan(jfc, max_interval=interval)
+
+    # the scan may have added episodes
+    jfc.invalidate_episode_index()
 
+
+async def wait_for_media_scan(jfc: JellyfinClient, *, max_interval: float = 30):
     task = await jfc.get_media_scan_task()
     if task is None:
         return
 
     scan_task_id = task["Id"]
+    previous = None
     while task["State"] == TaskState.Running.value:
-        await anyio.sleep(interval)
+        progress = (time.monotonic(), task.get("CurrentProgressPercentage") or 0.0)
+        wait_s = next_poll_interval(progress, previous, max_interval)
+        logger.debug("Waiting for library scan", progress=progress[1], wait_s=wait_s)
+        await anyio.sleep(wait_s)
+
+        previous = progress
         task = await jfc.get_task_by_id(scan_task_id)
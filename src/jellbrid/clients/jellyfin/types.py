@@ -19,3 +19,9 @@ class Task(t.TypedDict):
     Category: str
     IsHidden: bool
     Key: str
+
+
+class EpisodeEntry(t.NamedTuple):
+    season: int | None
+    episode: int | None
+    name: str
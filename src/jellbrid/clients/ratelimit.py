@@ -0,0 +1,96 @@
+import time
+
+import anyio
+
+
+class TokenBucket:
+    """
+    A token bucket that refills at a steady rate, up to a burst of tokens.
+    Waiters are served in the order that they arrive, so that concurrent
+    handlers share the rate fairly instead of all retrying at once.
+    """
+
+    def __init__(self, requests_per_minute: int, *, burst: int = 1):
+        if requests_per_minute <= 0:
+            raise ValueError(
+                f"requests_per_minute must be greater than 0, not {requests_per_minute}"
+            )
+        self.rate = requests_per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = anyio.Lock()
+
+        self.n_acquired = 0
+        self.n_waited = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    async def acquire(self):
+        start = time.monotonic()
+        # the lock is fair, so it acts as the queue of waiting requests
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                await anyio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+        waited = time.monotonic() - start
+        self.n_acquired += 1
+        if waited > 0.001:
+            self.n_waited += 1
+        self.total_wait_s += waited
+        self.max_wait_s = max(self.max_wait_s, waited)
+
+    def stats(self) -> dict:
+        return {
+            "acquired": self.n_acquired,
+            "waited": self.n_waited,
+            "wait_total_s": round(self.total_wait_s, 3),
+            "wait_avg_s": round(self.total_wait_s / max(1, self.n_acquired), 3),
+            "wait_max_s": round(self.max_wait_s, 3),
+        }
+
+
+class RateLimiter:
+    """
+    Limits requests to an upstream before they are sent. Writes (any request
+    that isn't a GET) can be limited by a separate bucket, on top of the bucket
+    shared by every request. A limit of 0 disables that bucket.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        *,
+        write_requests_per_minute: int | None = None,
+        burst: int = 1,
+    ):
+        self.bucket = None
+        if requests_per_minute != 0:
+            self.bucket = TokenBucket(requests_per_minute, burst=burst)
+        self.write_bucket = None
+        if write_requests_per_minute:
+            self.write_bucket = TokenBucket(write_requests_per_minute, burst=burst)
+
+    async def acquire(self, method: str):
+        if self.write_bucket is not None and method.upper() != "GET":
+            await self.write_bucket.acquire()
+        if self.bucket is not None:
+            await self.bucket.acquire()
+
+    def stats(self) -> dict:
+        stats = {}
+        if self.bucket is not None:
+            stats["all"] = self.bucket.stats()
+        if self.write_bucket is not None:
+            stats["write"] = self.write_bucket.stats()
+        return stats
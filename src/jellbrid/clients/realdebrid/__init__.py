@@ -1,12 +1,24 @@
+from .account import (
+    ACTIVE_STATUSES,
+    FAILED_STATUSES,
+    FINAL_STATUSES,
+    UNKNOWN_RESOURCE_ERROR_CODE,
+    TorrentIndex,
+)
 from .bundle import RDBundle, RDBundleManager
 from .client import RealDebridClient
 from .downloader import RealDebridDownloader
 from .types import TorrentStatus
 
 __all__ = (
+    "ACTIVE_STATUSES",
+    "FAILED_STATUSES",
+    "FINAL_STATUSES",
     "RealDebridClient",
     "RDBundleManager",
     "RDBundle",
     "RealDebridDownloader",
+    "TorrentIndex",
     "TorrentStatus",
+    "UNKNOWN_RESOURCE_ERROR_CODE",
 )
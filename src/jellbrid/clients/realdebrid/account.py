@@ -0,0 +1,88 @@
+import time
+
+# torrents in these states will never change again
+FINAL_STATUSES = frozenset({"downloaded", "error", "magnet_error", "virus", "dead"})
+# torrents in these states will never finish downloading
+FAILED_STATUSES = frozenset({"error", "magnet_error", "virus", "dead"})
+# torrents in these states are still being worked on by RD
+ACTIVE_STATUSES = frozenset(
+    {"magnet_conversion", "queued", "downloading", "compressing", "uploading"}
+)
+# the error code RD returns for a torrent that isn't in the account
+UNKNOWN_RESOURCE_ERROR_CODE = 7
+
+
+class TorrentIndex:
+    """
+    A local mirror of the torrents in the RD account, indexed by id and hash.
+    The mirror is kept up to date by RealDebridClient.sync_torrents.
+    """
+
+    def __init__(self):
+        self.by_id: dict[str, dict] = {}
+        self.by_hash: dict[str, dict] = {}
+        self.last_full_sync: float | None = None
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, torrent_id: str):
+        return torrent_id in self.by_id
+
+    def get(self, torrent_id: str) -> dict | None:
+        return self.by_id.get(torrent_id, None)
+
+    def get_by_hash(self, hash: str) -> dict | None:
+        return self.by_hash.get(hash.lower(), None)
+
+    def with_status(self, statuses: frozenset[str] | set[str]) -> list[dict]:
+        return [t for t in self.by_id.values() if t["status"] in statuses]
+
+    def needs_full_sync(self, max_age_s: int) -> bool:
+        if self.last_full_sync is None:
+            return True
+        return time.monotonic() - self.last_full_sync > max_age_s
+
+    def oldest_pending(self) -> str | None:
+        """Returns when the oldest torrent that could still change was added"""
+        pending = [
+            t["added"] for t in self.by_id.values() if t["status"] not in FINAL_STATUSES
+        ]
+        return min(pending, default=None)
+
+    def upsert(self, torrent: dict):
+        self.by_id[torrent["id"]] = torrent
+        self.by_hash[torrent["hash"].lower()] = torrent
+
+    def remove(self, torrent_id: str):
+        torrent = self.by_id.pop(torrent_id, None)
+        if torrent is None:
+            return
+        hash = torrent["hash"].lower()
+        if self.by_hash.get(hash) is torrent:
+            del self.by_hash[hash]
+            # the same hash can be in the account more than once
+            for other in self.by_id.values():
+                if other["hash"].lower() == hash:
+                    self.by_hash[hash] = other
+                    break
+
+    def update(self, torrents: list[dict], *, complete: bool, full: bool = False):
+        """
+        Updates the index with a newest first listing of torrents. Known torrents
+        that are missing from the range the listing covers have been deleted.
+        """
+        seen = {t["id"] for t in torrents}
+        oldest = torrents[-1]["added"] if torrents else None
+        for torrent_id, torrent in list(self.by_id.items()):
+            if torrent_id in seen:
+                continue
+            if complete or (oldest is not None and torrent["added"] > oldest):
+                self.remove(torrent_id)
+
+        # upsert oldest first so the newest torrent wins for duplicate hashes
+        for torrent in reversed(torrents):
+            self.upsert(torrent)
+
+        if full and complete:
+            self.last_full_sync = time.monotonic()
@@ -1,8 +1,15 @@
+import functools
 import typing as t
 
+from jellbrid.clients.realdebrid.filters import compile_filters
 from jellbrid.clients.realdebrid.types import RDBundleFileFilter
 
 
+class BundleMatches(t.NamedTuple):
+    file_ids: list[str]
+    filenames: list[str]
+
+
 class RDBundleManager:
     def __init__(
         self,
@@ -10,6 +17,8 @@ class RDBundleManager:
         *,
         file_filters: list[RDBundleFileFilter] | None = None,
     ):
+        # every bundle shares one filter that's been compiled from the chain
+        file_filters = [compile_filters(file_filters)] if file_filters else None
         if isinstance(data, list):
             self.bundles = [RDBundle(d, file_filters=file_filters) for d in data]
         else:
@@ -47,7 +56,7 @@ class RDBundle:
 
     @property
     def matches(self):
-        return self._get_property_for_matches("file_id")
+        return self._matches.file_ids
 
     @property
     def instant_availability(self):
@@ -55,16 +64,16 @@ class RDBundle:
 
     @property
     def file_ids(self):
-        return self._get_property_for_matches("file_id")
+        return self._matches.file_ids
 
     @property
     def filenames(self):
-        return self._get_property_for_matches("filename")
+        return self._matches.filenames
 
-    def _get_property_for_matches(
-        self, property: t.Literal["filename"] | t.Literal["file_id"]
-    ) -> list[str]:
-        files = []
+    @functools.cached_property
+    def _matches(self) -> BundleMatches:
+        """Runs every file through the filters once, for all of the properties"""
+        file_ids, filenames = [], []
         for file_id, file_data in self.bundle.items():
             filename: str = file_data.get("filename", "").lower()
 
@@ -72,12 +81,10 @@ class RDBundle:
                 if not filter(filename):
                     break
             else:
-                if property == "filename":
-                    files.append(filename)
-                if property == "file_id":
-                    files.append(file_id)
+                file_ids.append(file_id)
+                filenames.append(filename)
 
-        return files
+        return BundleMatches(file_ids, filenames)
 
 
 class TorrentBundle:
@@ -97,7 +104,7 @@ class TorrentBundle:
 
     @property
     def matches(self):
-        return self._get_property_for_matches("file_id")
+        return self._matches.file_ids
 
     @property
     def instant_availability(self):
@@ -106,17 +113,16 @@ class TorrentBundle:
 
     @property
     def file_ids(self):
-        return self._get_property_for_matches("file_id")
+        return self._matches.file_ids
 
     @property
     def filenames(self):
-        return self._get_property_for_matches("filename")
-
-    def _get_property_for_matches(
-        self, property: t.Literal["filename"] | t.Literal["file_id"]
-    ) -> list[str]:
-        files = []
+        return self._matches.filenames
 
+    @functools.cached_property
+    def _matches(self) -> BundleMatches:
+        """Runs every file through the filters once, for all of the properties"""
+        file_ids, filenames = [], []
         for filedata in self.bundle["files"]:
             filename: str = filedata.get("path")
             file_id: str = filedata.get("id")
@@ -124,9 +130,7 @@ class TorrentBundle:
                 if not filter(filename):
                     break
             else:
-                if property == "filename":
-                    files.append(filename)
-                if property == "file_id":
-                    files.append(file_id)
+                file_ids.append(file_id)
+                filenames.append(filename)
 
-        return files
+        return BundleMatches(file_ids, filenames)
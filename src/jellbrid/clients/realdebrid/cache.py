@@ -0,0 +1,66 @@
+import json
+
+from cachetools import TLRUCache
+
+# a rough allowance for the key and bookkeeping of each entry
+ENTRY_OVERHEAD_BYTES = 128
+
+
+def is_available(data: dict | list) -> bool:
+    return bool(data) and bool(data.get("rd", []))  # type: ignore
+
+
+def _sizeof(data: dict | list) -> int:
+    return len(json.dumps(data, separators=(",", ":"))) + ENTRY_OVERHEAD_BYTES
+
+
+class AvailabilityCache(TLRUCache):
+    """
+    Caches instant availability data per hash within a budget of bytes, rather
+    than a number of entries, evicting the least recently used hashes first.
+    Hashes that aren't available are cached with their own TTL, so that they
+    can be skipped without asking RD again.
+    """
+
+    def __init__(self, max_bytes: int, *, ttl_s: int, negative_ttl_s: int):
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        super().__init__(maxsize=max_bytes, ttu=self._ttu, getsizeof=_sizeof)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _ttu(self, key: str, data: dict | list, now: float) -> float:
+        return now + (self.ttl_s if is_available(data) else self.negative_ttl_s)
+
+    def lookup(self, key: str) -> dict | list | None:
+        """Like get, but counted towards the cache's hits and misses"""
+        data = self.get(key, None)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "bytes": self.currsize,
+            "max_bytes": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,12 +1,15 @@
 import typing as t
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
+import anyio
 import structlog
-from async_lru import alru_cache
-from cachetools import TTLCache
 
 from jellbrid.clients.base import BaseClient
-from jellbrid.clients.realdebrid.bundle import RDBundleManager
+from jellbrid.clients.ratelimit import RateLimiter
+from jellbrid.clients.realdebrid.account import FAILED_STATUSES, TorrentIndex
+from jellbrid.clients.realdebrid.bundle import RDBundle, RDBundleManager, TorrentBundle
+from jellbrid.clients.realdebrid.cache import AvailabilityCache, is_available
 from jellbrid.clients.realdebrid.types import (
     InstantAvailablityType,
     MagnetAddedResponse,
@@ -14,17 +17,54 @@ from jellbrid.clients.realdebrid.types import (
     TorrentStatus,
 )
 from jellbrid.config import Config
+from jellbrid.storage import TorrentFiles, TorrentFilesRepo
 
 logger = structlog.get_logger(__name__)
 
+# The number of hashes to lookup per instantAvailability request. This keeps the
+# request path (which contains every hash) to a reasonable length
+AVAILABILITY_CHUNK_SIZE = 50
+# The number of torrents to list per page when syncing the account's torrents
+FULL_SYNC_PAGE_SIZE = 1000
+INCREMENTAL_SYNC_PAGE_SIZE = 100
+
+
+@dataclass
+class TorrentProbe:
+    data: dict
+    # the torrent that was added to RD to list the files, if one was needed
+    torrent_id: str | None = None
+    claimed: bool = False
+
+    def claim(self) -> str | None:
+        """Takes ownership of the probed torrent, so that it isn't deleted"""
+        self.claimed = True
+        return self.torrent_id
+
 
 class RealDebridClient:
-    def __init__(self, cfg: Config):
+    def __init__(self, cfg: Config, *, files_repo: TorrentFilesRepo | None = None):
+        self.rate_limiter = RateLimiter(
+            cfg.rd_requests_per_minute,
+            write_requests_per_minute=cfg.rd_write_requests_per_minute,
+            burst=cfg.rd_requests_burst,
+        )
         self.client = BaseClient(
-            url=cfg.rd_api_url, headers={"Authorization": f"Bearer {cfg.rd_api_key}"}
+            url=cfg.rd_api_url,
+            headers={"Authorization": f"Bearer {cfg.rd_api_key}"},
+            rate_limiter=self.rate_limiter,
+            http=cfg.rd_http,
         )
         self.cfg = cfg
-        self.cache = TTLCache(maxsize=200, ttl=60 * 60)
+        self.cache = AvailabilityCache(
+            cfg.rd_availability_cache_bytes,
+            ttl_s=cfg.rd_availability_ttl_s,
+            negative_ttl_s=cfg.rd_availability_negative_ttl_s,
+        )
+        self.files_repo = files_repo
+        self.torrents = TorrentIndex()
+        # bounds the number of temporary torrents added across all downloaders
+        self.probe_limiter = anyio.CapacityLimiter(cfg.rd_probe_concurrency)
 
     async def get_instant_availability_data(
         self, hashes: list[str]
@@ -36,24 +76,40 @@ class RealDebridClient:
 
         # get results from cache
         for h in [h.lower() for h in hashes]:
-            cached_data = self.cache.get(h, None)
+            cached_data = self.cache.lookup(h)
             if cached_data is not None:
                 results[h] = cached_data
             else:
                 misses.append(h)
 
         if misses:
-            # submit a request for missing hashes
-            all_data = await self._get_instant_availability_data(misses)
+            # submit a request per chunk of missing hashes, all at once
+            async with anyio.create_task_group() as tg:
+                for i in range(0, len(misses), AVAILABILITY_CHUNK_SIZE):
+                    chunk = misses[i : i + AVAILABILITY_CHUNK_SIZE]
+                    tg.start_soon(self._fill_instant_availability_cache, chunk, results)
 
-            # update cache with results from data
-            for key, data in all_data.items():
-                self.cache[key] = data
+        return results
+
+    async def _fill_instant_availability_cache(
+        self, hashes: list[str], results: InstantAvailablityType
+    ):
+        all_data = await self._get_instant_availability_data(hashes)
 
-            # update our results
-            results.update(all_data)
+        # hashes that RD doesn't return at all aren't available either
+        for h in hashes:
+            all_data.setdefault(h, [])
 
-        return results
+        # update cache with results from data
+        for key, data in all_data.items():
+            try:
+                self.cache[key] = data
+            except ValueError:
+                # the data alone is larger than the cache
+                logger.warning("Availability data too large to cache", hash=key)
+
+        # update our results
+        results.update(all_data)
 
     async def _get_instant_availability_data(
         self, hashes: list[str]
@@ -77,19 +133,13 @@ class RealDebridClient:
 
         results = {}
         for key, data in candidates.items():
-            if data == []:
-                continue
-            if data.get("rd", []) == []:
-                continue
-            results[key] = data
+            if is_available(data):
+                results[key] = data
         return results
 
     async def instantly_available(self, hash: str) -> bool:
         result = await self.get_instant_availability_data([hash])
-        if result.get(hash, {}) == []:
-            return False
-        rd_data = result.get(hash, {}).get("rd", [])
-        return len(rd_data) > 0
+        return is_available(result.get(hash.lower(), []))
 
     async def add_magnet(self, hash: str) -> MagnetAddedResponse:
         if not hash.startswith("magnet:?xt=urn:btih:"):
@@ -101,7 +151,9 @@ class RealDebridClient:
         return t.cast(MagnetAddedResponse, result)
 
     async def delete_magnet(self, id: str):
-        return await self.client.request("DELETE", f"torrents/delete/{id}")
+        result = await self.client.request("DELETE", f"torrents/delete/{id}")
+        self.torrents.remove(id)
+        return result
 
     async def select_files(self, torrent_id: str, files: t.Iterable[str]) -> dict:
         files = [str(f) for f in files]
@@ -121,55 +173,195 @@ class RealDebridClient:
         )
         return results
 
+    async def sync_torrents(self, *, full: bool = False) -> TorrentIndex:
+        """
+        Brings the local mirror of the account's torrents up to date. RD lists
+        torrents newest first, so an incremental sync only pages back until it
+        has seen every torrent that could have changed: new torrents and ones
+        that haven't finished. A full sync is done periodically to catch older
+        torrents that were deleted outside of jellbrid.
+        """
+        full = full or self.torrents.needs_full_sync(self.cfg.rd_full_sync_interval_s)
+        page_size = FULL_SYNC_PAGE_SIZE if full else INCREMENTAL_SYNC_PAGE_SIZE
+        oldest_pending = None if full else self.torrents.oldest_pending()
+
+        torrents: list[dict] = []
+        complete = False
+        page = 1
+        while True:
+            results = await self.client.request(
+                "GET", "torrents", params={"page": page, "limit": page_size}
+            )
+            if "error" in results:
+                logger.warning("Unable to list RD torrents", **results)
+                return self.torrents
+            # RD responds with no content once we've paged past the last torrent
+            results = results or []
+            torrents.extend(results)
+            if len(results) < page_size:
+                complete = True
+                break
+            if not full:
+                all_known = all(t["id"] in self.torrents for t in results)
+                oldest = results[-1]["added"]
+                if all_known and (oldest_pending is None or oldest < oldest_pending):
+                    break
+            page += 1
+
+        self.torrents.update(torrents, complete=complete, full=full)
+        logger.debug(
+            "Synced RD torrents", full=full, pages=page, n_torrents=len(self.torrents)
+        )
+        return self.torrents
+
+    async def find_account_torrent(
+        self, hash: str, file_ids: t.Iterable[str]
+    ) -> str | None:
+        """
+        Returns the id of a torrent for the hash that's already in the account
+        with all of the given files selected
+        """
+        torrent = self.torrents.get_by_hash(hash)
+        if torrent is None or torrent["status"] in FAILED_STATUSES:
+            return None
+
+        info = await self.get_torrent_files_info(torrent["id"])
+        selected = {str(f["id"]) for f in info.get("files", []) if f.get("selected")}
+        if selected and {str(f) for f in file_ids} <= selected:
+            return torrent["id"]
+        return None
+
     async def get_torrent_files_info(self, torrent_id: str) -> dict:
         return await self.client.request("GET", f"torrents/info/{torrent_id}")
 
-    @alru_cache(ttl=60 * 60)
+    async def get_active_count(self) -> dict:
+        return await self.client.request("GET", "torrents/activeCount")
+
+    async def get_probe_slots(self) -> int:
+        """
+        Returns how many torrents can be probed at once without exceeding the
+        number of active torrents allowed on the account
+        """
+        count = await self.get_active_count()
+        free_slots = count.get("limit", 0) - count.get("nb", 0)
+        return max(1, min(self.cfg.rd_probe_concurrency, free_slots))
+
     async def collect_data_from_uncached_torrent(self, hash: str) -> dict:
-        async with self.tmp_torrent(hash) as tmp_torrent_id:
-            data = await self.get_torrent_files_info(tmp_torrent_id)
-        return data
+        async with self.probe_torrent(hash) as probe:
+            return probe.data
 
     @asynccontextmanager
-    async def tmp_torrent(self, hash: str):
-        torrent = await self.add_magnet(hash)
-        torrent_id = torrent.get("id")
-        if torrent_id is None:
-            logger.warning("Unable to add magnet", **torrent)
-            return
-        try:
-            yield torrent_id
-        finally:
-            await self.delete_magnet(torrent_id)
-
-    async def get_rd_bundle_with_file_count(
+    async def probe_torrent(self, hash: str) -> t.AsyncIterator[TorrentProbe]:
+        """
+        Yields the files in a torrent. A hash only ever needs to be probed once
+        when the client has a repo to store the files in.
+
+        Probing adds the torrent to RD. It's deleted when the context exits
+        unless the probe has been claimed, so that it can be downloaded without
+        adding the magnet a second time.
+        """
+        hash = hash.lower()
+        if self.files_repo is not None:
+            torrent_files = await self.files_repo.get(hash)
+            if torrent_files is not None:
+                yield TorrentProbe(torrent_files.to_torrent_info())
+                return
+
+        # the files of a torrent that's already in the account can be read
+        # without adding it again
+        torrent = self.torrents.get_by_hash(hash)
+        if torrent is not None:
+            data = await self.get_torrent_files_info(torrent["id"])
+            if data.get("files"):
+                if self.files_repo is not None:
+                    torrent_files = TorrentFiles.from_torrent_info(hash, data)
+                    await self.files_repo.add(torrent_files)
+                yield TorrentProbe(data)
+                return
+
+        async with self.probe_limiter:
+            # a cancelled add could leave a torrent behind that we can't cleanup
+            with anyio.CancelScope(shield=True):
+                torrent = await self.add_magnet(hash)
+            torrent_id = torrent.get("id")
+            if torrent_id is None:
+                logger.warning("Unable to add magnet", **torrent)
+                yield TorrentProbe({"files": []})
+                return
+
+            probe = TorrentProbe({"files": []}, torrent_id=torrent_id)
+            try:
+                probe.data = await self.get_torrent_files_info(torrent_id)
+                # files aren't listed until RD has finished converting the magnet
+                if self.files_repo is not None and probe.data.get("files"):
+                    torrent_files = TorrentFiles.from_torrent_info(hash, probe.data)
+                    await self.files_repo.add(torrent_files)
+                yield probe
+            finally:
+                # always cleanup, even if the probe was cancelled
+                if not probe.claimed:
+                    with anyio.CancelScope(shield=True):
+                        await self.delete_magnet(torrent_id)
+
+    def get_rd_bundle_with_file_count(
         self,
         hash: str,
         count: int,
         *,
         file_filters: list[RDBundleFileFilter] | None = None,
     ):
-        rdc = await self._get_bundle_manager(hash, file_filters)
-        return rdc.get_bundle_of_size(count)
+        return self._find_bundle(
+            hash, file_filters, lambda rdc: rdc.get_bundle_of_size(count)
+        )
 
-    async def get_rd_bundle_with_file_count_gte(
+    def get_rd_bundle_with_file_count_gte(
         self,
         hash: str,
         count: int,
         *,
         file_filters: list[RDBundleFileFilter] | None = None,
     ):
-        rdc = await self._get_bundle_manager(hash, file_filters)
-        return rdc.get_bundle_gte_size(count)
+        return self._find_bundle(
+            hash, file_filters, lambda rdc: rdc.get_bundle_gte_size(count)
+        )
 
-    async def get_rd_bundle_with_file_match(
+    def get_rd_bundle_with_file_match(
         self, hash: str, *, file_filters: list[RDBundleFileFilter] | None = None
     ):
-        rdc = await self._get_bundle_manager(hash, file_filters)
-        return rdc.get_bundle_with_match()
+        return self._find_bundle(
+            hash, file_filters, lambda rdc: rdc.get_bundle_with_match()
+        )
 
-    async def _get_bundle_manager(
-        self, hash: str, file_filters: list[RDBundleFileFilter] | None = None
-    ):
-        data = await self.collect_data_from_uncached_torrent(hash)
-        return RDBundleManager(data, file_filters=file_filters)
+    @asynccontextmanager
+    async def _find_bundle(
+        self,
+        hash: str,
+        file_filters: list[RDBundleFileFilter] | None,
+        select: t.Callable[[RDBundleManager], RDBundle | TorrentBundle | None],
+    ) -> t.AsyncIterator[tuple[RDBundle | TorrentBundle | None, TorrentProbe | None]]:
+        """
+        Selects a bundle from the instant availability data that has already been
+        prefetched for this hash, only falling back to probing the torrent's
+        files on RD when that data doesn't contain a suitable bundle. The probe
+        is yielded with the bundle so that its torrent can be claimed while the
+        context is open.
+        """
+        rd_data = self.get_cached_rd_data(hash)
+        if rd_data:
+            bundle = select(RDBundleManager(rd_data, file_filters=file_filters))
+            if bundle is not None:
+                yield bundle, None
+                return
+
+        async with self.probe_torrent(hash) as probe:
+            yield select(RDBundleManager(probe.data, file_filters=file_filters)), probe
+
+    def get_cached_rd_data(self, hash: str) -> list[dict[str, dict]]:
+        """
+        Returns the RD instant availability variants for a hash, without making
+        any requests. Hashes that aren't cached, or aren't available, return []
+        """
+        data = self.cache.get(hash.lower(), None)
+        if not data:
+            return []
+        return data.get("rd", [])
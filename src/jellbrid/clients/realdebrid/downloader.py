@@ -1,10 +1,11 @@
-import functools
 import typing as t
 
+import anyio
 import structlog
+from anyio.abc import TaskGroup
 
 from jellbrid.clients.realdebrid.bundle import RDBundle, TorrentBundle
-from jellbrid.clients.realdebrid.client import RealDebridClient
+from jellbrid.clients.realdebrid.client import RealDebridClient, TorrentProbe
 from jellbrid.clients.realdebrid.filters import (
     episode_filter,
     filter_extension,
@@ -12,7 +13,7 @@ from jellbrid.clients.realdebrid.filters import (
     movie_name_filter,
 )
 from jellbrid.clients.realdebrid.types import RDBundleFileFilter
-from jellbrid.clients.torrentio import Stream
+from jellbrid.clients.torrentio import Stream, rank_streams
 from jellbrid.clients.torrentio.filters import (
     name_contains_full_season,
     name_contains_release_year,
@@ -21,6 +22,10 @@ from jellbrid.requests import EpisodeRequest, MovieRequest, SeasonRequest
 
 logger = structlog.get_logger(__name__)
 
+BundleSearch = t.AsyncContextManager[
+    tuple[RDBundle | TorrentBundle | None, TorrentProbe | None]
+]
+
 
 class RealDebridDownloader:
     def __init__(
@@ -37,6 +42,27 @@ class RealDebridDownloader:
 
         self.filters = filters or []
         self.filters.extend((filter_samples, filter_extension))
+        self._prefetched = False
+        self._probe_slots: int | None = None
+
+    async def prefetch(self):
+        """
+        Resolves the instant availability of every candidate stream with a
+        batched lookup, then ranks the streams so that the ones most likely to
+        download are searched first, starting with the instantly available
+        ones. Searching streams after this only needs to reach out to RD for
+        streams that aren't available.
+        """
+        if self._prefetched:
+            return
+
+        hashes = [s["infoHash"] for s in self.streams]
+        if hashes:
+            await self.rdbc.get_instant_availability_data(hashes)
+
+        available = {h.lower() for h in hashes if self.rdbc.get_cached_rd_data(h)}
+        self.streams = rank_streams(self.streams, self.request, available=available)
+        self._prefetched = True
 
     def _filter_full_season_named_streams(self, streams: list[Stream]) -> list[Stream]:
         results = []
@@ -52,133 +78,151 @@ class RealDebridDownloader:
                 results.append(stream)
         return results
 
-    async def _find_bundle_with_file_count(
+    def _find_bundle_with_file_count(
         self, stream: Stream, count: int, *, filter: RDBundleFileFilter | None = None
     ):
-        ffs = self.filters + [filter] if filter else self.filters
-        cache = await self.rdbc.get_rd_bundle_with_file_count(
+        # the request's filter is the most selective, so it's matched first
+        ffs = [filter] + self.filters if filter else self.filters
+        return self.rdbc.get_rd_bundle_with_file_count(
             stream["infoHash"], count, file_filters=ffs
         )
-        return cache
 
-    async def _find_bundle_with_file(self, stream: Stream):
+    def _find_bundle_with_file(self, stream: Stream):
         if not isinstance(self.request, EpisodeRequest):
             raise Exception("Attempt to use episode filter on an unsupported Request")
-        e_filter = functools.partial(
-            episode_filter,
-            season_id=self.request.season_id,
-            episode_id=self.request.episode_id,
-        )
-        ffs = self.filters + [e_filter]
-        cache = await self.rdbc.get_rd_bundle_with_file_match(
+        e_filter = episode_filter(self.request.season_id, self.request.episode_id)
+        ffs = [e_filter] + self.filters
+        return self.rdbc.get_rd_bundle_with_file_match(
             stream["infoHash"], file_filters=ffs
         )
-        return cache
 
-    async def _find_bundle_with_file_ratio(self, stream: Stream, ratio: float):
+    def _find_bundle_with_file_ratio(self, stream: Stream, ratio: float):
         if not isinstance(self.request, SeasonRequest):
             raise Exception("Attempt to use ratio filter on an unsupported Request")
 
         count = int(len(self.request.episodes) * ratio)
-        bundle = await self.rdbc.get_rd_bundle_with_file_count_gte(
+        return self.rdbc.get_rd_bundle_with_file_count_gte(
             stream["infoHash"], count, file_filters=self.filters
         )
-        return bundle
 
     async def download_movie(self) -> str | None:
+        await self.prefetch()
         streams = self.streams
         # try to get better results on movies with ambiguous titles
         if len(self.request.title) < 6:
             streams = self._filter_streams_with_release_year(streams)
 
-        movie_filter = functools.partial(movie_name_filter, name=self.request.title)
+        movie_filter = movie_name_filter(self.request.title)
 
-        for stream in streams:
-            hash = stream["infoHash"]
-            with structlog.contextvars.bound_contextvars(
-                hash=hash, rdbc_cache_size=self.rdbc.cache.currsize
-            ):
-                bundle = await self._find_bundle_with_file_count(
-                    stream, 1, filter=movie_filter
-                )
-                if bundle is None:
-                    continue
-                downloaded = await self._download(stream, bundle)
-                if downloaded is not None:
-                    return downloaded
-        return None
+        def find(stream: Stream):
+            return self._find_bundle_with_file_count(stream, 1, filter=movie_filter)
+
+        return await self._search(streams, find)
 
     async def download_show(self) -> str | None:
         # this is probably unecessary for cached streams, but necessary for
         # uncached
+        await self.prefetch()
         streams = self.streams
         candidates = self._filter_full_season_named_streams(streams)
 
         # try to find a bundle with at least 80% of the files we want
-        for stream in candidates:
-            hash = stream["infoHash"]
-            with structlog.contextvars.bound_contextvars(
-                hash=hash, rdbc_cache_size=self.rdbc.cache.currsize
-            ):
-                bundle = await self._find_bundle_with_file_ratio(stream, 0.8)
-                if bundle is None:
-                    continue
-                downloaded = await self._download(stream, bundle)
-                if downloaded is not None:
-                    return downloaded
+        downloaded = await self._search(
+            candidates, lambda s: self._find_bundle_with_file_ratio(s, 0.8)
+        )
+        if downloaded is not None:
+            return downloaded
 
         # try to find a bundle with any amount of files
-        for stream in candidates:
-            with structlog.contextvars.bound_contextvars(hash=stream["infoHash"]):
-                bundle = await self._find_bundle_with_file_ratio(stream, 0)
-                if bundle is None:
-                    continue
-                downloaded = await self._download(stream, bundle)
-                if downloaded is not None:
-                    return downloaded
-        return None
+        return await self._search(
+            candidates, lambda s: self._find_bundle_with_file_ratio(s, 0)
+        )
 
     async def download_episode(self) -> str | None:
         if isinstance(self.request, (MovieRequest, SeasonRequest)):
             raise Exception("Can't download episode for given request type")
 
-        e_filter = functools.partial(
-            episode_filter,
-            season_id=self.request.season_id,
-            episode_id=self.request.episode_id,
-        )
+        e_filter = episode_filter(self.request.season_id, self.request.episode_id)
+        await self.prefetch()
+
         # look for a single file that's instantly available
-        for stream in self.streams:
-            hash = stream["infoHash"]
-            with structlog.contextvars.bound_contextvars(
-                hash=hash, rdbc_cache_size=self.rdbc.cache.currsize
-            ):
-                bundle = await self._find_bundle_with_file_count(
-                    stream, 1, filter=e_filter
-                )
-                if bundle is None:
-                    continue
-
-                downloaded = await self._download(stream, bundle)
-                if downloaded is not None:
-                    return downloaded
-        return None
+        def find(stream: Stream):
+            return self._find_bundle_with_file_count(stream, 1, filter=e_filter)
+
+        return await self._search(self.streams, find)
 
     async def download_episode_from_bundle(self) -> str | None:
-        for stream in self.streams:
-            hash = stream["infoHash"]
-            with structlog.contextvars.bound_contextvars(hash=hash):
-                bundle = await self._find_bundle_with_file(stream)
-                if bundle is None:
-                    continue
-
-                downloaded = await self._download(stream, bundle)
-                if downloaded is not None:
-                    return downloaded
-        return None
+        await self.prefetch()
+        return await self._search(self.streams, self._find_bundle_with_file)
+
+    async def _get_probe_slots(self) -> int:
+        # looked up once per downloader, and only when a stream needs probing
+        if self._probe_slots is None:
+            self._probe_slots = await self.rdbc.get_probe_slots()
+        return self._probe_slots
+
+    async def _search(
+        self,
+        streams: list[Stream],
+        find: t.Callable[[Stream], BundleSearch],
+    ) -> str | None:
+        """
+        Searches the streams for a bundle and downloads it. Streams are searched
+        in order, and once one needs probing, several are probed at once,
+        bounded by the number of free torrent slots on the RD account. The first
+        bundle that downloads wins and cancels every other probe that's still
+        running, which cleans up its temporary torrent.
+        The winner's probe torrent is downloaded directly, rather than adding
+        the magnet again.
+        """
+        if not streams:
+            return None
+
+        remaining = iter(streams)
+        download_lock = anyio.Lock()
+        downloaded: str | None = None
+        probing = False
+
+        async def start_probing(tg: TaskGroup):
+            nonlocal probing
+            if probing:
+                return
+            probing = True
+            n_workers = min(len(streams), await self._get_probe_slots())
+            for _ in range(n_workers - 1):
+                tg.start_soon(worker, tg)
+
+        async def worker(tg: TaskGroup):
+            nonlocal downloaded
+            for stream in remaining:
+                # instantly available streams are searched without RD requests,
+                # so more workers are only needed once streams are probed
+                if not self.rdbc.get_cached_rd_data(stream["infoHash"]):
+                    await start_probing(tg)
+                with structlog.contextvars.bound_contextvars(hash=stream["infoHash"]):
+                    async with find(stream) as (bundle, probe):
+                        if bundle is None:
+                            continue
+
+                        # only download one bundle at a time
+                        async with download_lock:
+                            if downloaded is not None:
+                                return
+                            result = await self._download(stream, bundle, probe)
+                            if result is not None:
+                                downloaded = result
+                                tg.cancel_scope.cancel()
+                                return
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(worker, tg)
+        return downloaded
 
     async def _download(
-        self, stream: Stream, bundle: RDBundle | TorrentBundle
+        self,
+        stream: Stream,
+        bundle: RDBundle | TorrentBundle,
+        probe: TorrentProbe | None = None,
     ) -> str | None:
         if self.rdbc.cfg.dev_mode:
             logger.info(
@@ -187,17 +231,28 @@ class RealDebridDownloader:
             )
             return ""
 
-        torrent = await self.rdbc.add_magnet(stream["infoHash"])
-        torrent_id = torrent.get("id")
+        # don't add a torrent that's already downloading the same files
+        existing_id = await self.rdbc.find_account_torrent(
+            stream["infoHash"], bundle.file_ids
+        )
+        if existing_id is not None:
+            logger.info("Torrent is already in the account", torrent_id=existing_id)
+            return existing_id
+
+        # reuse the torrent that was added to find the bundle, if there is one
+        torrent_id = probe.claim() if probe is not None else None
         if torrent_id is None:
-            logger.warning("Unable to add magnet", **torrent)
-            return None
+            torrent = await self.rdbc.add_magnet(stream["infoHash"])
+            torrent_id = torrent.get("id")
+            if torrent_id is None:
+                logger.warning("Unable to add magnet", **torrent)
+                return None
 
-        result = await self.rdbc.select_files(torrent["id"], bundle.file_ids)
+        result = await self.rdbc.select_files(torrent_id, bundle.file_ids)
         if "error" in result:
             logger.warning("Unable to start torrent", **result)
             result = await self.rdbc.delete_magnet(torrent_id)
             return None
 
         logger.info("Downloaded torrent")
-        return torrent["id"]
+        return torrent_id
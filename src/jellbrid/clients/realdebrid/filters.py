@@ -1,43 +1,92 @@
-def episode_filter(name: str, season_id: int, episode_id: int):
-    """This function can be used to filter RD bundles for cached torrents"""
+import functools
+import re
+import typing as t
 
-    name = name.lower()
-    if f"s{season_id}e{episode_id}" in name:
-        return True
-    if f"s{season_id}.e{episode_id}" in name:
-        return True
+from jellbrid.clients.realdebrid.types import RDBundleFileFilter
+
+
+class PatternFilter:
+    """
+    A file filter expressed as a regex that's matched against the start of the
+    lowercased filename, typically as a lookahead. Pattern filters are fused
+    into a single regex by compile_filters, so that a filename only needs to be
+    lowercased and scanned once for the whole chain.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.regex = re.compile(pattern, re.DOTALL)
+
+    def __call__(self, filename: str) -> bool:
+        return self.regex.match(filename.lower()) is not None
+
+    def __repr__(self):
+        return f"PatternFilter({self.pattern!r})"
+
+
+def _contains_any(substrings: t.Iterable[str]) -> str:
+    options = "|".join(re.escape(s) for s in dict.fromkeys(substrings))
+    return f"(?=.*(?:{options}))"
+
+
+def episode_filter(season_id: int, episode_id: int) -> PatternFilter:
+    """This filter can be used to filter RD bundles for cached torrents"""
 
     season_ = f"{season_id}".zfill(2)
     episode_ = f"{episode_id}".zfill(2)
-    if f"s{season_}e{episode_}" in name:
-        return True
-    if f"s{season_}.e{episode_}" in name:
-        return True
-    return False
+    return PatternFilter(
+        _contains_any(
+            [
+                f"s{season_id}e{episode_id}",
+                f"s{season_id}.e{episode_id}",
+                f"s{season_}e{episode_}",
+                f"s{season_}.e{episode_}",
+            ]
+        )
+    )
+
 
+def movie_name_filter(name: str) -> PatternFilter:
+    """Matches filenames that contain every word in the movie's name"""
 
-def movie_name_filter(filename: str, name: str) -> bool:
+    pattern = ""
     for word in name.lower().split():
         word = word.strip(":")
         word = word.removesuffix("'s")
-        if word not in filename.lower():
-            return False
+        pattern += _contains_any([word])
+    return PatternFilter(pattern)
 
-    return True
 
+# This filter can be used to filter RD bundles for cached torrents
+filter_samples = PatternFilter(r"(?!.*sample)")
 
-def filter_samples(filename: str):
-    """This function can be used to filter RD bundles for cached torrents"""
-    return "sample" not in filename.lower()
+# This filter can be used to filter RD bundles for cached torrents
+filter_extension = PatternFilter(r"(?=.*(?:mp4|mkv|avi|mpg)\Z)")
 
 
-def filter_extension(filename: str):
-    """This function can be used to filter RD bundles for cached torrents"""
+def compile_filters(filters: t.Sequence[RDBundleFileFilter]) -> RDBundleFileFilter:
+    """
+    Combines a chain of filters into one. Every pattern filter is matched with a
+    single regex, and any other filters are then called in order. Patterns are
+    matched in the order they are given, so the most selective should be first.
+    """
+    patterns = tuple(f.pattern for f in filters if isinstance(f, PatternFilter))
+    others = tuple(f for f in filters if not isinstance(f, PatternFilter))
+    return _compile_filters(patterns, others)
 
-    filename = filename.lower()
-    return (
-        filename.endswith("mp4")
-        or filename.endswith("mkv")
-        or filename.endswith("avi")
-        or filename.endswith("mpg")
-    )
+
+@functools.lru_cache(maxsize=256)
+def _compile_filters(
+    patterns: tuple[str, ...], others: tuple[RDBundleFileFilter, ...]
+) -> RDBundleFileFilter:
+    match = re.compile("".join(patterns), re.DOTALL).match
+
+    def compiled_filter(filename: str) -> bool:
+        return match(filename.lower()) is not None
+
+    def compiled_filter_with_others(filename: str) -> bool:
+        if match(filename.lower()) is None:
+            return False
+        return all(f(filename) for f in others)
+
+    return compiled_filter_with_others if others else compiled_filter
@@ -1,8 +1,8 @@
 from .client import SeerrsClient
-from .services import get_requests, parse_request
+from .services import parse_request, parse_requests
 
 __all__ = (
     "SeerrsClient",
-    "get_requests",
     "parse_request",
+    "parse_requests",
 )
@@ -1,6 +1,10 @@
 import typing as t
 import urllib.parse
 
+import anyio
+import structlog
+from anyio.streams.memory import MemoryObjectSendStream
+
 from jellbrid.clients.base import BaseClient
 from jellbrid.clients.seers.types import (
     SeerrMediaRequest,
@@ -8,35 +12,115 @@ from jellbrid.clients.seers.types import (
     SeerrShowDetail,
 )
 from jellbrid.config import Config
+from jellbrid.storage import SeerrMetadata, SeerrMetadataRepo
+
+logger = structlog.get_logger(__name__)
 
 
 class SeerrsClient:
-    def __init__(self, cfg: Config):
+    def __init__(self, cfg: Config, *, metadata_repo: SeerrMetadataRepo | None = None):
         url = cfg.seerr_url
         self.api_path = "api/v1/"
         api_url = urllib.parse.urljoin(url, self.api_path)
-        self.client = BaseClient(api_url, headers={"X-Api-Key": cfg.seerr_api_key})
+        self.client = BaseClient(
+            api_url, headers={"X-Api-Key": cfg.seerr_api_key}, http=cfg.seerr_http
+        )
         self.cfg = cfg
+        self.metadata_repo = metadata_repo
+
+    async def send_processing_requests(
+        self, send: MemoryObjectSendStream[list[SeerrMediaRequest]]
+    ):
+        """
+        Sends every processing request to the stream, a page at a time, and
+        closes it after the last page. Start this in a task group, so that the
+        next page is fetched while the current one is being consumed. Errors
+        reading a page are logged and end the stream early
+        """
+        take = self.cfg.seerr_page_size
+        async with send:
+            skip = 0
+            while True:
+                params = {"take": take, "skip": skip, "filter": "processing"}
+                try:
+                    response = await self.client.request(
+                        "GET", "request/", params=params
+                    )
+                except Exception:
+                    logger.exception("Unable to list requests", skip=skip)
+                    return
+                if "results" not in response:
+                    logger.warning("Unable to list requests", skip=skip, **response)
+                    return
+
+                page = t.cast(list[SeerrMediaRequest], response["results"])
+                try:
+                    await send.send(page)
+                except anyio.BrokenResourceError:
+                    # the consumer stopped early
+                    return
 
-    async def get_processing_requests(self) -> list[SeerrMediaRequest]:
-        params = {"take": 1000, "skip": 0, "filter": "processing"}
-        response = await self.client.request("GET", "request/", params=params)
-        return t.cast(list[SeerrMediaRequest], response["results"])
+                skip += len(page)
+                total = response.get("pageInfo", {}).get("results", 0)
+                if len(page) < take or skip >= total:
+                    return
 
-    async def get_movie_details(self, movie_id: int) -> SeerrMovieDetail:
-        response = await self.client.request("GET", f"movie/{movie_id}/")
+    async def get_movie_details(
+        self, movie_id: int, *, updated_at: str | None = None
+    ) -> SeerrMovieDetail:
+        response = await self.get_metadata(
+            f"movie/{movie_id}/",
+            ttl_s=self.cfg.seerr_details_ttl_s,
+            updated_at=updated_at,
+        )
         return t.cast(SeerrMovieDetail, response)
 
-    async def get_show_details(self, show_id: int) -> SeerrShowDetail:
-        response = await self.client.request("GET", f"tv/{show_id}/")
+    async def get_show_details(
+        self, show_id: int, *, updated_at: str | None = None
+    ) -> SeerrShowDetail:
+        response = await self.get_metadata(
+            f"tv/{show_id}/", ttl_s=self.cfg.seerr_details_ttl_s, updated_at=updated_at
+        )
         return t.cast(SeerrShowDetail, response)
 
+    async def get_metadata(
+        self, path: str, *, ttl_s: int, updated_at: str | None = None
+    ) -> dict:
+        """
+        Reads details from the metadata repo when possible, otherwise from
+        seerr. Details are read again once they're older than ttl_s, or when
+        updated_at (the media's updatedAt) has changed since they were stored
+        """
+        if self.metadata_repo is None:
+            return await self.client.request("GET", path)
+
+        cached = await self.metadata_repo.get(path)
+        if (
+            cached is not None
+            and cached.age().total_seconds() < ttl_s
+            and (updated_at is None or cached.updated_at == updated_at)
+        ):
+            return cached.data
+
+        response = await self.client.request("GET", path)
+        # seerr describes errors with a message, which shouldn't be kept
+        if response and "message" not in response and "error" not in response:
+            metadata = SeerrMetadata(key=path, data=response, updated_at=updated_at)
+            await self.metadata_repo.put(metadata)
+        return response
+
     async def sync_with_jellyfin(self):
         return await self.client.request("POST", "settings/jobs/jellyfin-full-scan/run")
 
     async def get_request(self, id: int):
         return await self.client.request("GET", f"request/{id}")
 
-    async def get_episodes_in_season(self, tmdb_id: int, season_id: int) -> list[dict]:
-        result = await self.client.request("GET", f"tv/{tmdb_id}/season/{season_id}")
+    async def get_episodes_in_season(
+        self, tmdb_id: int, season_id: int, *, updated_at: str | None = None
+    ) -> list[dict]:
+        result = await self.get_metadata(
+            f"tv/{tmdb_id}/season/{season_id}",
+            ttl_s=self.cfg.seerr_season_ttl_s,
+            updated_at=updated_at,
+        )
         return result["episodes"]
@@ -1,11 +1,14 @@
 import typing as t
 
+import anyio
 import structlog
+from anyio.streams.memory import MemoryObjectSendStream
 
 from jellbrid.clients.jellyfin import JellyfinClient
 from jellbrid.clients.seers.client import SeerrsClient
 from jellbrid.clients.seers.types import SeerrMediaRequest, SeerrShowDetail
 from jellbrid.requests import EpisodeRequest, MediaRequest, MovieRequest, SeasonRequest
+from jellbrid.tracker import RequestTracker
 
 logger = structlog.get_logger(__name__)
 
@@ -18,19 +21,22 @@ async def parse_request(
     ignore_partials: bool = True,
 ):
     tmdb_id = request["media"]["tmdbId"]
+    # cached details are read again when the media has changed
+    updated_at = request["media"].get("updatedAt")
 
     if request["type"] == "movie":
-        details = await sc.get_movie_details(tmdb_id)
+        details = await sc.get_movie_details(tmdb_id, updated_at=updated_at)
         mr = MovieRequest(
             title=details["title"],
             imdb_id=details["imdbId"],
             tmdb_id=tmdb_id,
             release_date=details["releaseDate"],
             alt_title=details["originalTitle"],
+            seerr_request_id=request["id"],
         )
         return [t.cast(MediaRequest, mr)]
 
-    details = await sc.get_show_details(tmdb_id)
+    details = await sc.get_show_details(tmdb_id, updated_at=updated_at)
     full_request = await sc.get_request(request["id"])
 
     results: list[MediaRequest] = []
@@ -55,7 +61,9 @@ async def parse_request(
         elif season["status"] == 2:
             logger.error("How did we get here? We should never get here")
             season_id = season_id
-            episodes = await sc.get_episodes_in_season(tmdb_id, season_id)
+            episodes = await sc.get_episodes_in_season(
+                tmdb_id, season_id, updated_at=updated_at
+            )
             sr = SeasonRequest(
                 title=details["name"],
                 tmdb_id=tmdb_id,
@@ -63,6 +71,7 @@ async def parse_request(
                 season_id=season_id,
                 episodes=[e["name"] for e in episodes],
                 release_date=details["firstAirDate"],
+                seerr_request_id=request["id"],
             )
             results.append(t.cast(MediaRequest, sr))
         elif season["status"] == 1:
@@ -76,7 +85,9 @@ async def parse_request(
             continue
 
         processed_seasons.add(season_id)
-        episodes = await sc.get_episodes_in_season(tmdb_id, season_id)
+        episodes = await sc.get_episodes_in_season(
+            tmdb_id, season_id, updated_at=updated_at
+        )
         sr = SeasonRequest(
             title=details["name"],
             alt_title=details["originalName"],
@@ -85,6 +96,7 @@ async def parse_request(
             season_id=season_id,
             episodes=[e["name"] for e in episodes],
             release_date=details["firstAirDate"],
+            seerr_request_id=request["id"],
         )
         results.append(t.cast(MediaRequest, sr))
     return results
@@ -99,13 +111,14 @@ async def create_episode_requests(
     show_info: SeerrShowDetail,
 ):
     tmdb_id = request["media"]["tmdbId"]
-    all_episodes_in_season = await sc.get_episodes_in_season(tmdb_id, season_id)
+    all_episodes_in_season = await sc.get_episodes_in_season(
+        tmdb_id, season_id, updated_at=request["media"].get("updatedAt")
+    )
     season_names_to_episodes = {e["name"]: e for e in all_episodes_in_season}
 
     # get the JF Season-IDs for the seasons that we have
     jf_media_id = request["media"]["jellyfinMediaId"]
-    all_episodes_in_jf = await jc.get_episodes_in_season(jf_media_id, season_id)
-    jf_episode_names = {e["Name"] for e in all_episodes_in_jf}
+    jf_episode_names = await jc.get_episode_names_in_season(jf_media_id, season_id)
 
     for episode in jf_episode_names:
         season_names_to_episodes.pop(episode, None)
@@ -121,14 +134,75 @@ async def create_episode_requests(
             season_id=season_id,
             episode_id=episode["episodeNumber"],
             release_date=episode["airDate"],
+            seerr_request_id=request["id"],
         )
         results.append(er)
     return results
 
 
-async def get_requests(
-    sc: SeerrsClient, jc: JellyfinClient
-) -> t.AsyncIterator[MediaRequest]:
-    for request in await sc.get_processing_requests():
-        for req in await parse_request(sc, jc, request, ignore_partials=False):
-            yield req
+def request_version(request: SeerrMediaRequest) -> str:
+    """Changes whenever the request, or the media it's for, is updated"""
+    return f"{request['updatedAt']}|{request['media'].get('updatedAt')}"
+
+
+async def parse_requests(
+    sc: SeerrsClient,
+    jc: JellyfinClient,
+    send: MemoryObjectSendStream[MediaRequest],
+    *,
+    tracker: RequestTracker | None = None,
+):
+    """
+    Sends the media requests for every processing seerr request to the stream,
+    in the order they finish parsing, and closes it once they're all parsed.
+    Start this in a task group and consume the other end of the stream.
+
+    Up to SEERR_PARSE_CONCURRENCY requests are parsed at once, and a request
+    that fails to parse is logged and skipped. Requests that the tracker has in
+    backoff are skipped without being parsed.
+    """
+    # bounds the requests being parsed, so pages aren't read too far ahead
+    semaphore = anyio.Semaphore(sc.cfg.seerr_parse_concurrency)
+    send_pages, receive_pages = anyio.create_memory_object_stream[
+        list[SeerrMediaRequest]
+    ]()
+    async with send, receive_pages, anyio.create_task_group() as tg:
+        tg.start_soon(sc.send_processing_requests, send_pages)
+        async for page in receive_pages:
+            for request in page:
+                if tracker is not None and tracker.should_skip(
+                    request["id"], request_version(request)
+                ):
+                    continue
+                await semaphore.acquire()
+                tg.start_soon(
+                    _parse_request, sc, jc, request, semaphore, send.clone(), tracker
+                )
+
+
+async def _parse_request(
+    sc: SeerrsClient,
+    jc: JellyfinClient,
+    request: SeerrMediaRequest,
+    semaphore: anyio.Semaphore,
+    send: MemoryObjectSendStream[MediaRequest],
+    tracker: RequestTracker | None,
+):
+    async with send:
+        try:
+            results = await parse_request(sc, jc, request, ignore_partials=False)
+        except Exception:
+            logger.exception("Unable to parse request", seerr_request_id=request["id"])
+            return
+        finally:
+            semaphore.release()
+
+        if tracker is not None:
+            tracker.parsed(request["id"], request_version(request), len(results))
+
+        try:
+            for req in results:
+                await send.send(req)
+        except anyio.BrokenResourceError:
+            # the consumer stopped early
+            return
@@ -0,0 +1,53 @@
+import typing as t
+from dataclasses import dataclass, field
+
+import anyio
+
+T = t.TypeVar("T")
+
+
+@dataclass
+class _Call:
+    done: anyio.Event = field(default_factory=anyio.Event)
+    result: t.Any = None
+    error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls. Callers that ask for a key while a
+    call for it is in flight wait for that call and share its result, instead
+    of making the same call themselves.
+    """
+
+    def __init__(self):
+        self.calls: dict[t.Hashable, _Call] = {}
+        self.n_calls = 0
+        self.n_coalesced = 0
+
+    async def do(self, key: t.Hashable, fn: t.Callable[[], t.Awaitable[T]]) -> T:
+        while (call := self.calls.get(key)) is not None:
+            await call.done.wait()
+            # a cancelled call belongs to the caller that made it, so retry
+            if isinstance(call.error, anyio.get_cancelled_exc_class()):
+                continue
+            self.n_coalesced += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        call = _Call()
+        self.calls[key] = call
+        self.n_calls += 1
+        try:
+            call.result = await fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            del self.calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        return {"calls": self.n_calls, "coalesced": self.n_coalesced}
@@ -1,12 +1,24 @@
 from .client import QualityFilter, SortOrder, TorrentioClient
-from .services import get_streams_for_movie, get_streams_for_show
+from .parser import ParsedStream, parse_stream
+from .ranking import rank_streams
+from .services import (
+    SeasonStreams,
+    get_streams_for_movie,
+    get_streams_for_season,
+    get_streams_for_show,
+)
 from .types import Stream
 
 __all__ = (
+    "ParsedStream",
+    "parse_stream",
+    "rank_streams",
     "Stream",
     "TorrentioClient",
     "SortOrder",
     "QualityFilter",
     "get_streams_for_movie",
+    "get_streams_for_season",
     "get_streams_for_show",
+    "SeasonStreams",
 )
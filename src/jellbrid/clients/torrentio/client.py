@@ -2,11 +2,16 @@ import datetime
 import enum
 import re
 
-from async_lru import alru_cache
+import structlog
+from anyio.abc import TaskGroup
 
 from jellbrid.clients.base import BaseClient
+from jellbrid.clients.hedged import HedgedClient
 from jellbrid.clients.torrentio.types import Stream
 from jellbrid.config import Config
+from jellbrid.storage import TorrentioStreams, TorrentioStreamsRepo
+
+logger = structlog.get_logger(__name__)
 
 
 class SortOrder(enum.Enum):
@@ -22,10 +27,30 @@ class QualityFilter(enum.Enum):
 
 
 class TorrentioClient:
-    def __init__(self, cfg: Config):
-        self.client = BaseClient(cfg.torrentio_url, {"User-Agent": "HTTPie/3.2.2"})
+    def __init__(
+        self,
+        cfg: Config,
+        *,
+        streams_repo: TorrentioStreamsRepo | None = None,
+        task_group: TaskGroup | None = None,
+    ):
+        self.client = HedgedClient(
+            [
+                BaseClient(url, {"User-Agent": "HTTPie/3.2.2"}, http=cfg.torrentio_http)
+                for url in cfg.torrentio_urls
+            ],
+            percentile=cfg.torrentio_hedge_percentile,
+            initial_delay_s=cfg.torrentio_hedge_delay_s,
+        )
         self.cfg = cfg
         self.rd_api_key = cfg.rd_api_key
+        self.streams_repo = streams_repo
+        # stale streams are refreshed in this task group, without blocking the
+        # caller. Without one, they are refreshed before returning
+        self.task_group = task_group
+        self.refreshing: set[str] = set()
+        self.ttl = datetime.timedelta(seconds=cfg.torrentio_cache_ttl_s)
+        self.max_age = datetime.timedelta(seconds=cfg.torrentio_cache_max_age_s)
 
     def is_older_media(self, release_year: str):
         release_year_ = int(release_year)
@@ -36,7 +61,6 @@ class TorrentioClient:
         path = f"sort={order.value}|qualityfilter={filter.value}/stream"
         return path
 
-    @alru_cache(ttl=60 * 60)  # cache torrents for 60 minutes
     async def get_movie_streams(
         self,
         movie_id: str,
@@ -46,10 +70,8 @@ class TorrentioClient:
     ) -> list[Stream]:
         path = self.path_for_options(sort_order, filter)
         path = f"{path}/movie/{movie_id}.json"
-        response = await self.client.request("GET", path)
-        return response["streams"]
+        return await self.get_streams(path)
 
-    @alru_cache(ttl=60 * 60)  # cache torrents for 60 minutes
     async def get_show_streams(
         self,
         show_id: str,
@@ -63,6 +85,53 @@ class TorrentioClient:
         episode_ = f"{episode}".zfill(2)
         path = self.path_for_options(sort_order, filter)
         path = f"{path}/series/{show_id}:{season_}:{episode_}.json"
+        return await self.get_streams(path)
+
+    async def get_streams(self, path: str) -> list[Stream]:
+        """
+        Returns the streams for a path from the streams repo when possible.
+        Streams older than the TTL are returned as is and refreshed in the
+        background, while streams older than the max age are refreshed first.
+        """
+        if self.streams_repo is None:
+            return await self._get_streams(path)
+
+        cached = await self.streams_repo.get(path)
+        if cached is None:
+            return await self._refresh_streams(path)
+
+        age = cached.age()
+        if age > self.max_age:
+            try:
+                return await self._refresh_streams(path)
+            except Exception:
+                # torrentio is flaky, so expired streams beat no streams
+                logger.warning("Failed to refresh expired streams", path=path)
+                return cached.streams  # type: ignore
+
+        if age > self.ttl and path not in self.refreshing:
+            if self.task_group is None:
+                return await self._refresh_streams(path)
+            self.refreshing.add(path)
+            self.task_group.start_soon(self._refresh_streams_in_background, path)
+
+        return cached.streams  # type: ignore
+
+    async def _refresh_streams_in_background(self, path: str):
+        try:
+            await self._refresh_streams(path)
+        except Exception:
+            logger.warning("Failed to refresh stale streams", path=path)
+        finally:
+            self.refreshing.discard(path)
+
+    async def _refresh_streams(self, path: str) -> list[Stream]:
+        streams = await self._get_streams(path)
+        if self.streams_repo is not None:
+            await self.streams_repo.put(TorrentioStreams(key=path, streams=streams))  # type: ignore
+        return streams
+
+    async def _get_streams(self, path: str) -> list[Stream]:
         response = await self.client.request("GET", path)
         return response["streams"]
 
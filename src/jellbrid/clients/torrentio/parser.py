@@ -0,0 +1,73 @@
+import re
+import typing as t
+
+from jellbrid.clients.torrentio.types import Stream
+
+RESOLUTIONS = {"2160p": 2160, "4k": 2160, "uhd": 2160, "1080p": 1080, "720p": 720}
+SIZE_UNITS = {"kb": 1024, "mb": 1024**2, "gb": 1024**3, "tb": 1024**4}
+
+_resolution = re.compile(r"\b(2160p|4k|uhd|1080p|720p|480p)\b")
+_size = re.compile(r"💾\s*([\d.]+)\s*(kb|mb|gb|tb)")
+_seeders = re.compile(r"👤\s*(\d+)")
+# S01E02, S01E02-E04, S01E02E03 and S01E02-04
+_episodes = re.compile(r"\bs(\d{1,2})[ ._]?e(\d{1,3})(?:-?e?(\d{1,3}))?\b")
+# S01, S01-S03, S01-03 and Season 1
+_seasons = re.compile(r"\b(?:s|season[ ._]?)(\d{1,2})(?:-s?(\d{1,2}))?\b")
+
+
+class ParsedStream(t.NamedTuple):
+    hash: str
+    resolution: int | None
+    size: int | None
+    seeders: int | None
+    seasons: tuple[int, ...]
+    episodes: tuple[int, ...]
+
+    @property
+    def is_season_pack(self) -> bool:
+        return bool(self.seasons) and not self.episodes
+
+
+def parse_stream(stream: Stream) -> ParsedStream:
+    """
+    Extracts what torrentio tells us about a stream from its name and title.
+    The first line of the title is the torrent's name, which is the only part
+    that describes the whole torrent, so seasons and episodes are read from it.
+    The details line (seeders, size and source) comes last.
+    """
+    name = stream.get("name", "").lower()
+    title = stream["title"].lower()
+    torrent_name = title.split("\n", 1)[0]
+
+    resolution = None
+    if m := _resolution.search(name) or _resolution.search(torrent_name):
+        resolution = RESOLUTIONS.get(m.group(1), 480)
+
+    size = None
+    if m := _size.search(title):
+        size = int(float(m.group(1)) * SIZE_UNITS[m.group(2)])
+
+    seeders = None
+    if m := _seeders.search(title):
+        seeders = int(m.group(1))
+
+    seasons: tuple[int, ...] = ()
+    episodes: tuple[int, ...] = ()
+    if m := _episodes.search(torrent_name):
+        first = int(m.group(2))
+        last = int(m.group(3)) if m.group(3) else first
+        seasons = (int(m.group(1)),)
+        episodes = tuple(range(first, max(first, last) + 1))
+    elif m := _seasons.search(torrent_name):
+        first = int(m.group(1))
+        last = int(m.group(2)) if m.group(2) else first
+        seasons = tuple(range(first, max(first, last) + 1))
+
+    return ParsedStream(
+        hash=stream["infoHash"].lower(),
+        resolution=resolution,
+        size=size,
+        seeders=seeders,
+        seasons=seasons,
+        episodes=episodes,
+    )
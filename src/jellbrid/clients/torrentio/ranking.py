@@ -0,0 +1,84 @@
+import math
+
+from jellbrid.clients.torrentio.parser import ParsedStream, parse_stream
+from jellbrid.clients.torrentio.types import Stream
+from jellbrid.requests import EpisodeRequest, MovieRequest, SeasonRequest
+
+# uncached torrents with fewer seeders than this are unlikely to finish on RD
+MIN_SEEDERS = 5
+
+
+def match_rank(
+    parsed: ParsedStream, request: MovieRequest | SeasonRequest | EpisodeRequest
+) -> int:
+    """
+    Ranks how closely a stream's name matches the request, where lower is
+    better. Streams that don't say what they contain rank after streams that
+    match, but before streams that name something else.
+    """
+    match request:
+        case EpisodeRequest():
+            if not parsed.seasons:
+                return 3
+            if request.season_id not in parsed.seasons:
+                return 4
+            if parsed.episodes == (request.episode_id,):
+                return 0
+            if request.episode_id in parsed.episodes:
+                return 1
+            if parsed.is_season_pack:
+                return 2
+            return 4
+        case SeasonRequest():
+            if not parsed.seasons:
+                return 2
+            if request.season_id not in parsed.seasons:
+                return 4
+            if parsed.episodes:
+                return 3
+            return 0 if len(parsed.seasons) == 1 else 1
+        case _:
+            return 1 if parsed.seasons else 0
+
+
+def seeders_rank(parsed: ParsedStream) -> int:
+    if parsed.seeders is None:
+        return 1
+    if parsed.seeders >= MIN_SEEDERS:
+        return 0
+    return 1 if parsed.seeders > 0 else 2
+
+
+def rank_streams(
+    streams: list[Stream],
+    request: MovieRequest | SeasonRequest | EpisodeRequest,
+    *,
+    available: set[str],
+) -> list[Stream]:
+    """
+    Orders streams by how likely they are to be downloaded, and how cheaply.
+    Instantly available streams come first, since they need no probe and no
+    download. Within each group, streams that match the request come first.
+    Uncached streams are then ordered by their seeders, since poorly seeded
+    torrents are unlikely to finish. Next comes the highest resolution, and
+    for uncached streams the smallest size, since smaller torrents finish
+    downloading sooner. Torrentio's order breaks any ties.
+    """
+
+    def key(item: tuple[int, Stream]):
+        i, stream = item
+        parsed = parse_stream(stream)
+        is_available = parsed.hash in available
+        download_size = 0.0
+        if not is_available:
+            download_size = parsed.size if parsed.size is not None else math.inf
+        return (
+            not is_available,
+            match_rank(parsed, request),
+            0 if is_available else seeders_rank(parsed),
+            -(parsed.resolution or 0),
+            download_size,
+            i,
+        )
+
+    return [s for _, s in sorted(enumerate(streams), key=key)]
@@ -1,6 +1,55 @@
+from dataclasses import dataclass, field
+
+import anyio
+import structlog
+
+from jellbrid.clients.base import UPSTREAM_UNAVAILABLE_ERRORS
 from jellbrid.clients.torrentio.client import QualityFilter, SortOrder, TorrentioClient
+from jellbrid.clients.torrentio.types import Stream
 from jellbrid.requests import EpisodeRequest, MovieRequest, SeasonRequest
 
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class SeasonStreams:
+    """
+    The streams listed for each episode of a season, deduplicated by hash so
+    that every episode shares the same candidate set
+    """
+
+    # every stream in the season, in the order they were first listed
+    streams: list[Stream] = field(default_factory=list)
+    # the hashes listed for each episode, in torrentio's order
+    episodes: dict[int, list[str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_listings(cls, listings: dict[int, list[Stream]]):
+        streams: dict[str, Stream] = {}
+        episodes = {}
+        for episode_id in sorted(listings):
+            episodes[episode_id] = []
+            for stream in listings[episode_id]:
+                h = stream["infoHash"].lower()
+                streams.setdefault(h, stream)
+                episodes[episode_id].append(h)
+        return cls(streams=list(streams.values()), episodes=episodes)
+
+    def restrict_to(self, streams: list[Stream]) -> "SeasonStreams":
+        """Drops any streams that aren't in streams, e.g. after filtering"""
+        keep = {s["infoHash"].lower() for s in streams}
+        return SeasonStreams(
+            streams=[s for s in self.streams if s["infoHash"].lower() in keep],
+            episodes={
+                e: [h for h in hashes if h in keep]
+                for e, hashes in self.episodes.items()
+            },
+        )
+
+    def for_episode(self, episode_id: int) -> list[Stream]:
+        by_hash = {s["infoHash"].lower(): s for s in self.streams}
+        return [by_hash[h] for h in self.episodes.get(episode_id, [])]
+
 
 async def get_streams_for_movie(tc: TorrentioClient, request: MovieRequest):
     if tc.is_older_media(request.release_year):
@@ -31,3 +80,36 @@ async def get_streams_for_show(
         filter=filter,
         sort_order=sort,
     )
+
+
+async def get_streams_for_season(
+    tc: TorrentioClient, requests: list[EpisodeRequest]
+) -> SeasonStreams:
+    """
+    Lists the streams for every episode request at once, with at most
+    TORRENTIO_CONCURRENCY lookups in flight. An episode whose listing can't be
+    read just has no streams, but torrentio being down fails the whole season,
+    since that doesn't mean nothing was found
+    """
+    limiter = anyio.CapacityLimiter(tc.cfg.torrentio_concurrency)
+    listings: dict[int, list[Stream]] = {}
+
+    async def fetch(request: EpisodeRequest):
+        async with limiter:
+            try:
+                listings[request.episode_id] = await get_streams_for_show(tc, request)
+            except UPSTREAM_UNAVAILABLE_ERRORS:
+                raise
+            except Exception:
+                logger.warning(
+                    "Unable to list streams for episode",
+                    episode=request.episode_id,
+                    exc_info=True,
+                )
+                listings[request.episode_id] = []
+
+    async with anyio.create_task_group() as tg:
+        for request in requests:
+            tg.start_soon(fetch, request)
+
+    return SeasonStreams.from_listings(listings)
@@ -0,0 +1,12 @@
+import typing as t
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ProcessRequest:
+    """Processes a single seerr request, e.g. when a webhook is received"""
+
+    request_id: int
+
+
+Command = t.Literal["process", "update", "clear_stalled"] | ProcessRequest
@@ -1,9 +1,90 @@
 import logging
+import urllib.parse
+from dataclasses import dataclass
 from pathlib import Path
 
 import environs
 
 
+@dataclass(frozen=True)
+class HttpSettings:
+    """
+    The connection pool, timeouts, protocol and retries of an upstream's HTTP
+    client
+    """
+
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry_s: float = 30.0
+    connect_timeout_s: float = 5.0
+    read_timeout_s: float = 10.0
+    write_timeout_s: float = 10.0
+    # how long to wait for a connection from the pool
+    pool_timeout_s: float = 10.0
+    # h2 is installed with httpx[http2]. Installs without it use HTTP/1.1
+    http2: bool = False
+    max_attempts: int = 5
+    # the longest a Retry-After header from the upstream is waited for
+    max_retry_after_s: float = 60.0
+    # fail fast after this many failures in a row, until the reset timeout
+    failure_threshold: int = 5
+    reset_timeout_s: float = 30.0
+
+    @classmethod
+    def from_env(cls, env: environs.Env, prefix: str, **defaults) -> "HttpSettings":
+        """
+        Reads the settings for an upstream from environment variables such as
+        RD_HTTP_MAX_CONNECTIONS, using the defaults given for anything not set
+        """
+        base = cls(**defaults)
+        with env.prefixed(f"{prefix}_HTTP_"):
+            return cls(
+                max_connections=env.int("MAX_CONNECTIONS", base.max_connections),
+                max_keepalive_connections=env.int(
+                    "MAX_KEEPALIVE_CONNECTIONS", base.max_keepalive_connections
+                ),
+                keepalive_expiry_s=env.float(
+                    "KEEPALIVE_EXPIRY_S", base.keepalive_expiry_s
+                ),
+                connect_timeout_s=env.float(
+                    "CONNECT_TIMEOUT_S", base.connect_timeout_s
+                ),
+                read_timeout_s=env.float("READ_TIMEOUT_S", base.read_timeout_s),
+                write_timeout_s=env.float("WRITE_TIMEOUT_S", base.write_timeout_s),
+                pool_timeout_s=env.float("POOL_TIMEOUT_S", base.pool_timeout_s),
+                http2=env.bool("HTTP2", base.http2),
+                max_attempts=env.int("MAX_ATTEMPTS", base.max_attempts),
+                max_retry_after_s=env.float(
+                    "MAX_RETRY_AFTER_S", base.max_retry_after_s
+                ),
+                failure_threshold=env.int("FAILURE_THRESHOLD", base.failure_threshold),
+                reset_timeout_s=env.float("RESET_TIMEOUT_S", base.reset_timeout_s),
+            )
+
+
+def url_list(env: environs.Env, name: str) -> list[str]:
+    """
+    Reads a comma separated list of URLs, validating each like env.url. Each
+    URL is given a single trailing slash, so that paths are joined onto it
+    """
+    urls = []
+    for value in env.list(name):
+        if not value.strip():
+            continue
+        url = urllib.parse.urlsplit(value.strip())
+        if url.scheme not in ("http", "https") or not url.netloc:
+            raise environs.EnvValidationError(
+                f'Environment variable "{name}" invalid: {value!r} is not a URL',
+                [f"{value!r} is not a URL"],
+            )
+        urls.append(url._replace(path=url.path.rstrip("/") + "/").geturl())
+    if not urls:
+        raise environs.EnvValidationError(
+            f'Environment variable "{name}" invalid: no URLs', ["no URLs"]
+        )
+    return urls
+
+
 class Config:
     def __init__(self):
         env = environs.Env()
@@ -12,15 +93,94 @@ class Config:
         self.rd_api_key: str = env("RD_API_KEY")
         self.jf_api_key: str = env("JF_API_KEY")
         self.jf_url: str = env.url("JF_URL").geturl()
+        # The ids of the Jellyfin libraries that downloads end up in. When set,
+        # only these libraries are refreshed rather than scanning every library
+        self.jf_library_ids: list[str] = env.list("JF_LIBRARY_IDS", default=[])
+        # How long to give a targeted library refresh to finish
+        self.jf_refresh_settle_s: int = env.int("JF_REFRESH_SETTLE_S", default=15)
+        # The longest a series' episodes are cached for between library scans
+        self.jf_episode_index_ttl_s: int = env.int(
+            "JF_EPISODE_INDEX_TTL_S", default=30 * 60
+        )
         self.seerr_api_key = env("SEERR_API_KEY")
         self.seerr_url = env.url("SEERR_URL").geturl()
-        self.torrentio_url = env.url("TORRENTIO_URL").geturl()
+        # How many requests to list from seerr per page
+        self.seerr_page_size: int = env.int("SEERR_PAGE_SIZE", default=100)
+        # How long to keep movie and show details, and the episodes in a season,
+        # read from seerr. They're read again sooner if the media is updated
+        self.seerr_details_ttl_s: int = env.int(
+            "SEERR_DETAILS_TTL_S", default=24 * 60 * 60
+        )
+        self.seerr_season_ttl_s: int = env.int(
+            "SEERR_SEASON_TTL_S", default=24 * 60 * 60
+        )
+        # How many seerr requests to parse into media requests at once
+        self.seerr_parse_concurrency: int = env.int(
+            "SEERR_PARSE_CONCURRENCY", default=8
+        )
+        # A comma separated list of torrentio compatible URLs. The first is the
+        # primary, and the rest are hedged against when it's slow or failing
+        self.torrentio_urls: list[str] = url_list(env, "TORRENTIO_URL")
         self.rd_api_url = env.url("RD_API_URL").geturl()
         self.jellbrid_log_level: int = env.log_level(
             "JELLBRID_LOG_LEVEL", default=logging.DEBUG
         )
         self.dev_mode: bool = env.bool("DEV_MODE", default=True)
         self.n_parallel_requests: int = env.int("N_PARALLEL_REQUESTS", default=1)
+        # How many uncached torrents to probe on RD at once
+        self.rd_probe_concurrency: int = env.int("RD_PROBE_CONCURRENCY", default=4)
+        # Client side rate limits for RD. Writes (adding, selecting and deleting
+        # torrents) can be limited further with their own rate. 0 disables a limit
+        self.rd_requests_per_minute: int = env.int(
+            "RD_REQUESTS_PER_MINUTE", default=250
+        )
+        self.rd_write_requests_per_minute: int | None = env.int(
+            "RD_WRITE_REQUESTS_PER_MINUTE", default=None
+        )
+        self.rd_requests_burst: int = env.int("RD_REQUESTS_BURST", default=10)
+        # How often to fully re-list the torrents in the RD account
+        self.rd_full_sync_interval_s: int = env.int(
+            "RD_FULL_SYNC_INTERVAL_S", default=60 * 60
+        )
+        # Byte budget and TTLs for cached instant availability data. Hashes that
+        # aren't available are kept for a shorter time
+        self.rd_availability_cache_bytes: int = env.int(
+            "RD_AVAILABILITY_CACHE_BYTES", default=32 * 1024 * 1024
+        )
+        self.rd_availability_ttl_s: int = env.int(
+            "RD_AVAILABILITY_TTL_S", default=60 * 60
+        )
+        self.rd_availability_negative_ttl_s: int = env.int(
+            "RD_AVAILABILITY_NEGATIVE_TTL_S", default=10 * 60
+        )
+        # How many torrentio lookups to make at once when listing a whole season
+        self.torrentio_concurrency: int = env.int("TORRENTIO_CONCURRENCY", default=4)
+        # Hedge torrentio requests after this percentile of the primary's recent
+        # latencies, or after the initial delay until there are enough of them
+        self.torrentio_hedge_percentile: float = env.float(
+            "TORRENTIO_HEDGE_PERCENTILE", default=0.95
+        )
+        self.torrentio_hedge_delay_s: float = env.float(
+            "TORRENTIO_HEDGE_DELAY_S", default=2.0
+        )
+        # Torrentio streams older than the TTL are served while being refreshed
+        # in the background. Streams older than the max age are refreshed first
+        self.torrentio_cache_ttl_s: int = env.int(
+            "TORRENTIO_CACHE_TTL_S", default=60 * 60
+        )
+        self.torrentio_cache_max_age_s: int = env.int(
+            "TORRENTIO_CACHE_MAX_AGE_S", default=24 * 60 * 60
+        )
+        # Each upstream has its own connection pool, so that a slow upstream
+        # can't use up the connections of the others
+        self.rd_http = HttpSettings.from_env(
+            env, "RD", max_connections=20, max_keepalive_connections=10
+        )
+        self.torrentio_http = HttpSettings.from_env(
+            env, "TORRENTIO", read_timeout_s=15.0
+        )
+        self.seerr_http = HttpSettings.from_env(env, "SEERR")
+        self.jf_http = HttpSettings.from_env(env, "JF", max_keepalive_connections=2)
         self.storage_dir = Path.home() / ".config/jellbrid"
         Path.mkdir(self.storage_dir, exist_ok=True)
         self.db = self.storage_dir / "jellbrid.db"
@@ -34,5 +194,17 @@ class Config:
         self.process_interval_s: int = env.int(
             "JELLBRID_PROCESS_INTERVAL_S", default=600
         )
+        # Requests that haven't changed are skipped for this long after being
+        # processed. The backoff doubles each time nothing is found for them
+        self.request_backoff_s: int = env.int("REQUEST_BACKOFF_S", default=60 * 60)
+        self.request_max_backoff_s: int = env.int(
+            "REQUEST_MAX_BACKOFF_S", default=24 * 60 * 60
+        )
+        # Downloads that complete within this window of each other are picked up
+        # by a single media refresh, which waits at most the max latency
+        self.media_refresh_window_s: int = env.int("MEDIA_REFRESH_WINDOW_S", default=20)
+        self.media_refresh_max_latency_s: int = env.int(
+            "MEDIA_REFRESH_MAX_LATENCY_S", default=120
+        )
         # How often to for and clear stalled downloads
         self.clear_interval_s: int = env.int("JELLBRID_CLEAR_INTERVAL_S", default=300)
@@ -0,0 +1,78 @@
+import typing as t
+from contextlib import asynccontextmanager
+
+import anyio
+import structlog
+
+from jellbrid.config import Config
+
+logger = structlog.get_logger(__name__)
+
+
+class RefreshScheduler:
+    """
+    Refreshes the media library after downloads complete, outside of request
+    processing. Completions that arrive within MEDIA_REFRESH_WINDOW_S of each
+    other are combined into a single refresh, which starts no later than
+    MEDIA_REFRESH_MAX_LATENCY_S after the first of them. Completions that arrive
+    during a refresh are handled by the next one.
+    """
+
+    def __init__(self, cfg: Config, refresh: t.Callable[[], t.Awaitable[t.Any]]):
+        self.refresh = refresh
+        self.window_s = cfg.media_refresh_window_s
+        self.max_latency_s = cfg.media_refresh_max_latency_s
+
+        self.first_at: float | None = None
+        self.last_at: float | None = None
+        self.n_pending = 0
+        self.closed = False
+        self._wake = anyio.Event()
+
+    def request(self, n_completed: int = 1):
+        now = anyio.current_time()
+        if self.first_at is None:
+            self.first_at = now
+        self.last_at = now
+        self.n_pending += n_completed
+        self._wake.set()
+
+    def close(self):
+        """Stops the scheduler once any pending refresh has run"""
+        self.closed = True
+        self._wake.set()
+
+    @asynccontextmanager
+    async def running(self):
+        """Runs the scheduler until the block exits and any pending refresh has run"""
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(self.run)
+            try:
+                yield self
+            finally:
+                self.close()
+
+    async def run(self):
+        while True:
+            if self.first_at is None or self.last_at is None:
+                if self.closed:
+                    return
+                await self._wake.wait()
+                self._wake = anyio.Event()
+                continue
+
+            deadline = min(
+                self.last_at + self.window_s, self.first_at + self.max_latency_s
+            )
+            delay = deadline - anyio.current_time()
+            if delay > 0:
+                await anyio.sleep(delay)
+                continue
+
+            n_completed = self.n_pending
+            self.first_at, self.last_at, self.n_pending = None, None, 0
+            logger.info("Refreshing media", completed_downloads=n_completed)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Unable to refresh media")
@@ -19,6 +19,8 @@ class MediaRequest:
     title: str
     release_date: str
     alt_title: str | None = None
+    # the seerr request this was parsed from, if any
+    seerr_request_id: int | None = None
 
     @property
     def ctx(self) -> dict:
@@ -58,6 +60,7 @@ class SeasonRequest(MediaRequest):
                 episode_name=name,
                 episode_id=i,
                 release_date=self.release_date,  # TODO - make this accurate
+                seerr_request_id=self.seerr_request_id,
             )
             requests.append(er)
         return requests
@@ -3,6 +3,14 @@ from .active_dls import ActiveDownload
 from .bad_hashes import BadHash
 from .hash_repo import BadHashRepo
 from .main import create_db, get_session_maker
+from .request_cursors import RequestCursor
+from .request_cursors_repo import RequestCursorRepo
+from .seerr_metadata import SeerrMetadata
+from .seerr_metadata_repo import SeerrMetadataRepo
+from .torrent_files import TorrentFiles
+from .torrent_files_repo import TorrentFilesRepo
+from .torrentio_streams import TorrentioStreams
+from .torrentio_streams_repo import TorrentioStreamsRepo
 
 __all__ = (
     "ActiveDownload",
@@ -11,4 +19,12 @@ __all__ = (
     "create_db",
     "ActiveDownloadRepo",
     "get_session_maker",
+    "RequestCursor",
+    "RequestCursorRepo",
+    "SeerrMetadata",
+    "SeerrMetadataRepo",
+    "TorrentFiles",
+    "TorrentFilesRepo",
+    "TorrentioStreams",
+    "TorrentioStreamsRepo",
 )
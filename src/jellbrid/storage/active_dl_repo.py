@@ -67,3 +67,11 @@ class ActiveDownloadRepo:
             query = delete(ActiveDownload).where(ActiveDownload.torrent_id == did)  # type: ignore
             await session.execute(query)
             await session.commit()
+
+    async def delete_by_dids(self, dids: list[str]) -> None:
+        if not dids:
+            return
+        async with self.session_maker() as session:
+            query = delete(ActiveDownload).where(ActiveDownload.torrent_id.in_(dids))  # type: ignore
+            await session.execute(query)
+            await session.commit()
@@ -2,10 +2,7 @@ import datetime
 from dataclasses import dataclass, field
 
 from jellbrid.requests import EpisodeRequest, MovieRequest, SeasonRequest
-
-
-def _utc_now() -> datetime.datetime:
-    return datetime.datetime.now(datetime.timezone.utc)
+from jellbrid.storage.utils import utc_now
 
 
 @dataclass
@@ -14,7 +11,7 @@ class ActiveDownload:
     tmdb_id: int
     title: str
     torrent_id: str
-    created_at: datetime.datetime = field(default_factory=_utc_now)
+    created_at: datetime.datetime = field(default_factory=utc_now)
     episode: int | None = None
     season: int | None = None
 
@@ -1,9 +1,7 @@
 import datetime
 from dataclasses import dataclass, field
 
-
-def _utc_now() -> datetime.datetime:
-    return datetime.datetime.now(datetime.timezone.utc)
+from jellbrid.storage.utils import utc_now
 
 
 @dataclass
@@ -12,4 +10,4 @@ class BadHash:
     filename: str
     progress: float
     status: str
-    created_at: datetime.datetime = field(default_factory=_utc_now)
+    created_at: datetime.datetime = field(default_factory=utc_now)
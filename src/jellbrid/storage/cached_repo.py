@@ -0,0 +1,57 @@
+import dataclasses
+import typing as t
+
+from cachetools import LRUCache
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+T = t.TypeVar("T")
+
+
+class CachedRepo(t.Generic[T]):
+    """
+    Stores rows that are looked up by a unique key column. An LRU cache in front
+    of the database serves the hot keys.
+    """
+
+    model: type[T]
+    # the name of the unique column that rows are looked up by
+    key: str
+
+    def __init__(
+        self, session_maker: async_sessionmaker[AsyncSession], maxsize: int = 1000
+    ):
+        self.session_maker = session_maker
+        self.cache: LRUCache[t.Any, T] = LRUCache(maxsize=maxsize)
+
+    async def get(self, key: t.Any) -> T | None:
+        item = self.cache.get(key, None)
+        if item is not None:
+            return item
+
+        async with self.session_maker() as session:
+            column = getattr(self.model, self.key)
+            item = await session.scalar(select(self.model).where(column == key))
+
+        if item is not None:
+            self.cache[key] = item
+        return item
+
+    async def upsert(self, item: T, *, replace: bool = True):
+        """Stores the item, replacing any row with its key unless replace is False"""
+        values = {f.name: getattr(item, f.name) for f in dataclasses.fields(item)}  # type: ignore
+        self.cache[values[self.key]] = item
+
+        query = insert(self.model).values(**values)
+        if replace:
+            query = query.on_conflict_do_update(
+                index_elements=[self.key],
+                set_={k: query.excluded[k] for k in values if k != self.key},
+            )
+        else:
+            query = query.on_conflict_do_nothing(index_elements=[self.key])
+
+        async with self.session_maker() as session:
+            await session.execute(query)
+            await session.commit()
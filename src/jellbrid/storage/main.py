@@ -4,7 +4,16 @@ import anyio
 import anyio.to_thread
 from alembic import command
 from alembic.config import Config as AlembicConfig
-from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+)
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -15,6 +24,10 @@ from sqlalchemy.orm import registry
 from jellbrid.config import Config
 from jellbrid.storage.active_dls import ActiveDownload
 from jellbrid.storage.bad_hashes import BadHash
+from jellbrid.storage.request_cursors import RequestCursor
+from jellbrid.storage.seerr_metadata import SeerrMetadata
+from jellbrid.storage.torrent_files import TorrentFiles
+from jellbrid.storage.torrentio_streams import TorrentioStreams
 
 meta = MetaData(
     naming_convention={
@@ -56,6 +69,10 @@ async def run_migrations():
 def start_mappers():
     mapper_registry.map_imperatively(ActiveDownload, active_downloads)
     mapper_registry.map_imperatively(BadHash, bad_hashes)
+    mapper_registry.map_imperatively(TorrentFiles, torrent_files)
+    mapper_registry.map_imperatively(TorrentioStreams, torrentio_streams)
+    mapper_registry.map_imperatively(SeerrMetadata, seerr_metadata)
+    mapper_registry.map_imperatively(RequestCursor, request_cursors)
 
 
 active_downloads = Table(
@@ -81,3 +98,44 @@ bad_hashes = Table(
     Column("progress", Float),
     Column("created_at", DateTime(timezone=True), nullable=False),
 )
+
+torrent_files = Table(
+    "torrent_files",
+    mapper_registry.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("hash", String(255), nullable=False, unique=True, index=True),
+    Column("filename", String(526), nullable=False),
+    Column("files", JSON, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+
+torrentio_streams = Table(
+    "torrentio_streams",
+    mapper_registry.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("key", String(526), nullable=False, unique=True, index=True),
+    Column("streams", JSON, nullable=False),
+    Column("fetched_at", DateTime(timezone=True), nullable=False),
+)
+
+seerr_metadata = Table(
+    "seerr_metadata",
+    mapper_registry.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("key", String(255), nullable=False, unique=True, index=True),
+    Column("data", JSON, nullable=False),
+    Column("updated_at", String(255), nullable=True),
+    Column("fetched_at", DateTime(timezone=True), nullable=False),
+)
+
+request_cursors = Table(
+    "request_cursors",
+    mapper_registry.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("seerr_request_id", Integer, nullable=False, unique=True, index=True),
+    Column("version", String(255), nullable=False),
+    Column("outcome", String(255), nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime(timezone=True), nullable=False),
+    Column("processed_at", DateTime(timezone=True), nullable=False),
+)
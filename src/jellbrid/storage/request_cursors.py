@@ -0,0 +1,20 @@
+import datetime
+from dataclasses import dataclass, field
+
+from jellbrid.storage.utils import as_utc, utc_now
+
+
+@dataclass
+class RequestCursor:
+    seerr_request_id: int
+    # the request's and its media's updatedAt when it was last processed
+    version: str
+    # found, not_found or nothing_to_do
+    outcome: str
+    # how many times in a row nothing was found for the request
+    attempts: int
+    next_attempt_at: datetime.datetime
+    processed_at: datetime.datetime = field(default_factory=utc_now)
+
+    def in_backoff(self) -> bool:
+        return utc_now() < as_utc(self.next_attempt_at)
@@ -0,0 +1,41 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from jellbrid.storage.request_cursors import RequestCursor
+
+
+class RequestCursorRepo:
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]):
+        self.session_maker = session_maker
+
+    async def get_all(self) -> dict[int, RequestCursor]:
+        async with self.session_maker() as session:
+            results = await session.scalars(select(RequestCursor))
+            return {c.seerr_request_id: c for c in results}
+
+    async def put_many(self, cursors: list[RequestCursor]):
+        if not cursors:
+            return
+        async with self.session_maker() as session:
+            for cursor in cursors:
+                query = insert(RequestCursor).values(
+                    seerr_request_id=cursor.seerr_request_id,
+                    version=cursor.version,
+                    outcome=cursor.outcome,
+                    attempts=cursor.attempts,
+                    next_attempt_at=cursor.next_attempt_at,
+                    processed_at=cursor.processed_at,
+                )
+                query = query.on_conflict_do_update(
+                    index_elements=["seerr_request_id"],
+                    set_={
+                        "version": query.excluded.version,
+                        "outcome": query.excluded.outcome,
+                        "attempts": query.excluded.attempts,
+                        "next_attempt_at": query.excluded.next_attempt_at,
+                        "processed_at": query.excluded.processed_at,
+                    },
+                )
+                await session.execute(query)
+            await session.commit()
@@ -0,0 +1,17 @@
+import datetime
+from dataclasses import dataclass, field
+
+from jellbrid.storage.utils import as_utc, utc_now
+
+
+@dataclass
+class SeerrMetadata:
+    # the seerr api path the data was read from, e.g. movie/123/
+    key: str
+    data: dict
+    # the media's updatedAt in seerr when the data was read, if known
+    updated_at: str | None = None
+    fetched_at: datetime.datetime = field(default_factory=utc_now)
+
+    def age(self) -> datetime.timedelta:
+        return utc_now() - as_utc(self.fetched_at)
@@ -0,0 +1,15 @@
+from jellbrid.storage.cached_repo import CachedRepo
+from jellbrid.storage.seerr_metadata import SeerrMetadata
+
+
+class SeerrMetadataRepo(CachedRepo[SeerrMetadata]):
+    """
+    Stores movie, show and season details read from seerr, so that they don't
+    need to be read again every time requests are processed
+    """
+
+    model = SeerrMetadata
+    key = "key"
+
+    async def put(self, metadata: SeerrMetadata):
+        await self.upsert(metadata)
@@ -0,0 +1,23 @@
+import datetime
+from dataclasses import dataclass, field
+
+from jellbrid.storage.utils import utc_now
+
+
+@dataclass
+class TorrentFiles:
+    hash: str
+    filename: str
+    files: list[dict]
+    created_at: datetime.datetime = field(default_factory=utc_now)
+
+    @classmethod
+    def from_torrent_info(cls, hash: str, info: dict):
+        return cls(
+            hash=hash.lower(),
+            filename=info.get("filename", ""),
+            files=info.get("files", []),
+        )
+
+    def to_torrent_info(self) -> dict:
+        return {"hash": self.hash, "filename": self.filename, "files": self.files}
@@ -0,0 +1,18 @@
+from jellbrid.storage.cached_repo import CachedRepo
+from jellbrid.storage.torrent_files import TorrentFiles
+
+
+class TorrentFilesRepo(CachedRepo[TorrentFiles]):
+    """
+    The files in a torrent never change, so they are stored for the lifetime of
+    the hash
+    """
+
+    model = TorrentFiles
+    key = "hash"
+
+    async def add(self, torrent_files: TorrentFiles):
+        await self.upsert(torrent_files, replace=False)
+
+    async def get(self, hash: str) -> TorrentFiles | None:
+        return await super().get(hash.lower())
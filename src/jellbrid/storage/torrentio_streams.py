@@ -0,0 +1,16 @@
+import datetime
+from dataclasses import dataclass, field
+
+from jellbrid.storage.utils import as_utc, utc_now
+
+
+@dataclass
+class TorrentioStreams:
+    # the torrentio path the streams were listed from, which includes the imdb
+    # id, season, episode, sort order and quality filter
+    key: str
+    streams: list[dict]
+    fetched_at: datetime.datetime = field(default_factory=utc_now)
+
+    def age(self) -> datetime.timedelta:
+        return utc_now() - as_utc(self.fetched_at)
@@ -0,0 +1,15 @@
+from jellbrid.storage.cached_repo import CachedRepo
+from jellbrid.storage.torrentio_streams import TorrentioStreams
+
+
+class TorrentioStreamsRepo(CachedRepo[TorrentioStreams]):
+    """
+    Stores the last streams listed by torrentio for each lookup, so that they
+    survive restarts
+    """
+
+    model = TorrentioStreams
+    key = "key"
+
+    async def put(self, streams: TorrentioStreams):
+        await self.upsert(streams)
@@ -0,0 +1,12 @@
+import datetime
+
+
+def utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def as_utc(dt: datetime.datetime) -> datetime.datetime:
+    """Restores the timezone of a datetime read back from sqlite, which drops it"""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
@@ -6,8 +6,16 @@ from jellbrid.config import Config
 class Synchronizer:
     def __init__(self, cfg: Config):
         self.semaphore = anyio.Semaphore(cfg.n_parallel_requests)
-        self.refresh = anyio.Event()
         self.processing_lock = anyio.Lock()
+        # the seerr requests being processed, by either a pass over all of the
+        # requests or a webhook, so that they aren't processed twice at once
+        self.active_requests: set[int] = set()
 
-    def reset(self):
-        self.refresh = anyio.Event()
+    def claim(self, request_id: int) -> bool:
+        if request_id in self.active_requests:
+            return False
+        self.active_requests.add(request_id)
+        return True
+
+    def release(self, *request_ids: int):
+        self.active_requests.difference_update(request_ids)
@@ -1,28 +1,43 @@
 import datetime
+import functools
+import typing as t
 
 import anyio
 import structlog
+from anyio.abc import TaskGroup
 from anyio.streams.memory import MemoryObjectSendStream
 from hypercorn.asyncio import serve
 from zoneinfo import ZoneInfo
 
+from jellbrid.clients.base import UPSTREAM_UNAVAILABLE_ERRORS
 from jellbrid.clients.jellyfin import JellyfinClient, scan_and_wait_for_completion
 from jellbrid.clients.realdebrid import (
+    ACTIVE_STATUSES,
+    FAILED_STATUSES,
+    UNKNOWN_RESOURCE_ERROR_CODE,
     RealDebridClient,
     RealDebridDownloader,
-    TorrentStatus,
 )
-from jellbrid.clients.seers import SeerrsClient, get_requests
+from jellbrid.clients.seers import SeerrsClient, parse_request, parse_requests
 from jellbrid.clients.torrentio import (
     Stream,
     TorrentioClient,
     get_streams_for_movie,
+    get_streams_for_season,
     get_streams_for_show,
 )
 from jellbrid.config import Config
-from jellbrid.requests import EpisodeRequest, MovieRequest, RequestCache, SeasonRequest
+from jellbrid.refresh import RefreshScheduler
+from jellbrid.requests import (
+    EpisodeRequest,
+    MediaRequest,
+    MovieRequest,
+    RequestCache,
+    SeasonRequest,
+)
 from jellbrid.storage import ActiveDownload, ActiveDownloadRepo, BadHash, BadHashRepo
 from jellbrid.sync import Synchronizer
+from jellbrid.tracker import RequestTracker
 from server import app, get_server_config
 
 logger = structlog.get_logger(__name__)
@@ -56,7 +71,11 @@ async def handle_movie_request(
     dl_repo: ActiveDownloadRepo,
     hash_repo: BadHashRepo,
     rc: RequestCache,
-):
+) -> bool | None:
+    """
+    Returns True if the movie was downloaded, False if nothing was found and
+    None if it didn't need to be searched for
+    """
     if await dl_repo.has_movie(request.imdb_id):
         logger.debug("Ignoring currently downloading movie")
         return
@@ -77,9 +96,10 @@ async def handle_movie_request(
             ad = ActiveDownload.from_movie_request(request, downloaded)
             await dl_repo.add(ad)
             rc.add_request(request)
-            return
+            return True
 
         logger.info("Unable to find any matching torrents")
+        return False
 
 
 async def handle_season_request(
@@ -91,7 +111,7 @@ async def handle_season_request(
     hash_repo: BadHashRepo,
     rc: RequestCache,
     backoff_to_episodes: bool = False,
-):
+) -> bool | None:
     if await dl_repo.has_season(request.imdb_id, request.season_id):
         logger.debug("Ignoring currently downloading season")
         return
@@ -111,17 +131,50 @@ async def handle_season_request(
             ad = ActiveDownload.from_season_request(request, downloaded)
             await dl_repo.add(ad)
             rc.add_request(request)
-            return
+            return True
 
         logger.info("Unable to find any matching torrents")
 
-    if backoff_to_episodes:
-        logger.info("Searching for individual episodes")
-        for er in request.to_episode_requests():
-            with structlog.contextvars.bound_contextvars(**er.ctx):
-                await handle_episode_request(
-                    er, tc, rdbc, sync, dl_repo=dl_repo, hash_repo=hash_repo, rc=rc
-                )
+    if not backoff_to_episodes:
+        return False
+
+    logger.info("Searching for individual episodes")
+    ers = []
+    for er in request.to_episode_requests():
+        if rc.has_request(er) or await dl_repo.has_episode(
+            er.imdb_id, er.season_id, er.episode_id
+        ):
+            continue
+        ers.append(er)
+
+    # list every episode up front and look up the availability of the
+    # whole season at once, rather than per episode
+    season_streams = await get_streams_for_season(tc, ers)
+    candidates = await filter_streams_with_bad_hashes(hash_repo, season_streams.streams)
+    season_streams = season_streams.restrict_to(candidates)
+    if candidates:
+        await rdbc.get_instant_availability_data([s["infoHash"] for s in candidates])
+
+    results = []
+    for er in ers:
+        with structlog.contextvars.bound_contextvars(**er.ctx):
+            result = await handle_episode_request(
+                er,
+                tc,
+                rdbc,
+                sync,
+                dl_repo=dl_repo,
+                hash_repo=hash_repo,
+                rc=rc,
+                streams=season_streams.for_episode(er.episode_id),
+            )
+            results.append(result)
+    # episodes that were skipped don't count as found
+    if any(r is True for r in results):
+        return True
+    if any(r is False for r in results):
+        return False
+    return None
 
 
 async def handle_episode_request(
@@ -132,7 +185,12 @@ async def handle_episode_request(
     dl_repo: ActiveDownloadRepo,
     hash_repo: BadHashRepo,
     rc: RequestCache,
-):
+    streams: list[Stream] | None = None,
+) -> bool | None:
+    """
+    Searches for and downloads an episode. streams can be given when they have
+    already been listed and filtered, e.g. for every episode of a season
+    """
     if await dl_repo.has_episode(
         request.imdb_id, request.season_id, request.episode_id
     ):
@@ -146,8 +204,9 @@ async def handle_episode_request(
     async with sync.semaphore:
         logger.info("Starting request handler")
 
-        streams = await get_streams_for_show(tc, request)
-        streams = await filter_streams_with_bad_hashes(hash_repo, streams)
+        if streams is None:
+            streams = await get_streams_for_show(tc, request)
+            streams = await filter_streams_with_bad_hashes(hash_repo, streams)
         rdd = RealDebridDownloader(rdbc, request=request, streams=streams)
 
         # search for a cached file with just the episode we want
@@ -161,43 +220,58 @@ async def handle_episode_request(
             ad = ActiveDownload.from_episode_request(request, downloaded)
             await dl_repo.add(ad)
             rc.add_request(request)
-            return
+            return True
 
         logger.info("Unable to find any matching torrents")
+        return False
 
 
 async def update_active_downloads(
     rdbc: RealDebridClient,
     repo: ActiveDownloadRepo,
     sync: Synchronizer,
-    seerrs: SeerrsClient,
-    jc: JellyfinClient,
+    refresher: RefreshScheduler,
 ):
     async with sync.processing_lock:
+        # one listing of the account covers every active download
+        torrents = await rdbc.sync_torrents()
+
+        finished = []
         for request in await repo.get_requests():
-            info = await rdbc.get_torrent_files_info(request.torrent_id)
-            if info["progress"] == 100:
-                sync.refresh.set()
-                await repo.delete(request)
+            info = torrents.get(request.torrent_id)
+            if info is None:
+                info = await rdbc.get_torrent_files_info(request.torrent_id)
+
+            if info.get("error_code") == UNKNOWN_RESOURCE_ERROR_CODE:
+                logger.warning(
+                    "Unable to find download", torrent_id=request.torrent_id, **info
+                )
+                finished.append(request.torrent_id)
+            elif "error" in info:
+                # keep the download, the next update will check it again
+                logger.warning(
+                    "Unable to check download", torrent_id=request.torrent_id, **info
+                )
+            elif info["progress"] == 100:
+                refresher.request()
+                finished.append(request.torrent_id)
                 logger.info(
                     f"Deleted completed request for {request.title} {request.torrent_id}"
                 )
-            elif info["status"] in ("error", "dead"):
+            elif info["status"] in FAILED_STATUSES:
                 logger.warning("Unable to process download")
-                await repo.delete(request)
+                finished.append(request.torrent_id)
 
-        if sync.refresh.is_set():
-            await update_media(jc, seerrs)
-            sync.reset()
+        await repo.delete_by_dids(finished)
         logger.info("Finised updating active downloads")
 
 
 async def update_media(jc: JellyfinClient, seerrs: SeerrsClient):
+    """
+    Run by the refresh scheduler, whose window also gives ZURG time to pick up
+    the new files
+    """
     cfg = Config()
-    logger.info("Sleeping to give ZURG time to pickup new files")
-    if not cfg.dev_mode:
-        await anyio.sleep(20)
-
     logger.info("Running library scan")
     if not cfg.dev_mode:
         await scan_and_wait_for_completion(jc)
@@ -211,6 +285,103 @@ async def update_media(jc: JellyfinClient, seerrs: SeerrsClient):
         await anyio.sleep(10)
 
 
+def _leaf_exceptions(excgroup: BaseExceptionGroup) -> list[BaseException]:
+    leaves = []
+    for e in excgroup.exceptions:
+        if isinstance(e, BaseExceptionGroup):
+            leaves.extend(_leaf_exceptions(e))
+        else:
+            leaves.append(e)
+    return leaves
+
+
+async def track_request(
+    tracker: RequestTracker,
+    handler: t.Callable[..., t.Awaitable[bool | None]],
+    request: MediaRequest,
+    *args,
+):
+    # errors raised in a handler's task groups come wrapped in exception groups
+    try:
+        result = await handler(request, *args)
+    except* UPSTREAM_UNAVAILABLE_ERRORS as excgroup:
+        # the request is tried again on the next pass, without its siblings
+        # being cancelled
+        logger.warning(
+            "Skipping request while a host is unavailable",
+            errors=[repr(e) for e in _leaf_exceptions(excgroup)],
+        )
+        tracker.interrupted(request)
+    else:
+        tracker.record(request, result)
+
+
+def dispatch_request(
+    tg: TaskGroup,
+    request: MediaRequest,
+    dl_repo: ActiveDownloadRepo,
+    hash_repo: BadHashRepo,
+    rdbc: RealDebridClient,
+    tc: TorrentioClient,
+    sync: Synchronizer,
+    rc: RequestCache,
+    tracker: RequestTracker,
+):
+    """Starts the handler for a media request in the task group"""
+    cfg = Config()
+    with structlog.contextvars.bound_contextvars(**request.ctx, dev_mode=cfg.dev_mode):
+        if request.imdb_id == "":
+            logger.warning("Unable to find IMDB for request")
+            tracker.record(request, False)
+            return
+        if cfg.tmdb_id is not None and request.tmdb_id != cfg.tmdb_id:
+            logger.debug("Skipping non-matching TMDB ID")
+            return
+        match request:
+            case MovieRequest():
+                tg.start_soon(
+                    track_request,
+                    tracker,
+                    handle_movie_request,
+                    request,
+                    tc,
+                    rdbc,
+                    sync,
+                    dl_repo,
+                    hash_repo,
+                    rc,
+                )
+            case SeasonRequest():
+                tg.start_soon(
+                    track_request,
+                    tracker,
+                    handle_season_request,
+                    request,
+                    tc,
+                    rdbc,
+                    sync,
+                    dl_repo,
+                    hash_repo,
+                    rc,
+                    True,
+                )
+            case EpisodeRequest():
+                tg.start_soon(
+                    track_request,
+                    tracker,
+                    handle_episode_request,
+                    request,
+                    tc,
+                    rdbc,
+                    sync,
+                    dl_repo,
+                    hash_repo,
+                    rc,
+                )
+            case _:
+                logger.warning("Got unknown media type")
+
+
 async def handle_requests(
     dl_repo: ActiveDownloadRepo,
     hash_repo: BadHashRepo,
@@ -220,64 +391,99 @@ async def handle_requests(
     tc: TorrentioClient,
     sync: Synchronizer,
     rc: RequestCache,
+    tracker: RequestTracker,
+    refresher: RefreshScheduler,
 ):
     async with sync.processing_lock:
-        cfg = Config()
+        # lets downloaders know which torrents are already in the account
+        await rdbc.sync_torrents()
+        await tracker.load()
 
+        claimed: set[int] = set()
         try:
-            async with anyio.create_task_group() as tg:
-                async for request in get_requests(seerrs, jc):
-                    with structlog.contextvars.bound_contextvars(
-                        **request.ctx, dev_mode=cfg.dev_mode
-                    ):
-                        if request.imdb_id == "":
-                            logger.warning("Unable to find IMDB for request")
-                            continue
-                        if cfg.tmdb_id is not None and request.tmdb_id != cfg.tmdb_id:
-                            logger.debug("Skipping non-matching TMDB ID")
+            send, receive = anyio.create_memory_object_stream[MediaRequest]()
+            async with anyio.create_task_group() as tg, receive:
+                tg.start_soon(
+                    functools.partial(parse_requests, seerrs, jc, send, tracker=tracker)
+                )
+                async for request in receive:
+                    # skip requests that a webhook is already processing
+                    request_id = request.seerr_request_id
+                    if request_id is not None and request_id not in claimed:
+                        if not sync.claim(request_id):
+                            logger.debug("Ignoring request that's being processed")
                             continue
-                        match request:
-                            case MovieRequest():
-                                tg.start_soon(
-                                    handle_movie_request,
-                                    request,
-                                    tc,
-                                    rdbc,
-                                    sync,
-                                    dl_repo,
-                                    hash_repo,
-                                    rc,
-                                )
-                            case SeasonRequest():
-                                tg.start_soon(
-                                    handle_season_request,
-                                    request,
-                                    tc,
-                                    rdbc,
-                                    sync,
-                                    dl_repo,
-                                    hash_repo,
-                                    rc,
-                                    True,
-                                )
-                            case EpisodeRequest():
-                                tg.start_soon(
-                                    handle_episode_request,
-                                    request,
-                                    tc,
-                                    rdbc,
-                                    sync,
-                                    dl_repo,
-                                    hash_repo,
-                                    rc,
-                                )
-                            case _:
-                                logger.warning("Got unknown media type")
-                        await anyio.sleep(1)
+                        claimed.add(request_id)
+
+                    dispatch_request(
+                        tg, request, dl_repo, hash_repo, rdbc, tc, sync, rc, tracker
+                    )
+                    await anyio.sleep(1)
         except* TypeError as excgroup:
             logger.exception(excgroup.exceptions)
+        finally:
+            sync.release(*claimed)
 
-    await update_active_downloads(rdbc, dl_repo, sync, seerrs, jc)
+        await tracker.save()
+
+        # time spent waiting on the RD rate limits, to help tune parallelism, and
+        # how many lookups were shared between concurrent handlers
+        logger.info(
+            "Finished processing requests",
+            rd_rate_limits=rdbc.rate_limiter.stats(),
+            rd_coalesced=rdbc.client.single_flight.stats(),
+            rd_availability_cache=rdbc.cache.stats(),
+            rd_circuit=rdbc.client.breaker.stats(),
+            torrentio_coalesced=tc.client.single_flight.stats(),
+            torrentio_hedging=tc.client.stats(),
+        )
+
+    await update_active_downloads(rdbc, dl_repo, sync, refresher)
+
+
+async def handle_seerr_request(
+    request_id: int,
+    dl_repo: ActiveDownloadRepo,
+    hash_repo: BadHashRepo,
+    rdbc: RealDebridClient,
+    seerrs: SeerrsClient,
+    jc: JellyfinClient,
+    tc: TorrentioClient,
+    sync: Synchronizer,
+    rc: RequestCache,
+    tracker: RequestTracker,
+):
+    """
+    Processes a single seerr request, without waiting for or making a pass over
+    every request. The periodic pass still picks up anything this misses
+    """
+    with structlog.contextvars.bound_contextvars(seerr_request_id=request_id):
+        if not sync.claim(request_id):
+            logger.debug("Ignoring request that's being processed")
+            return
+
+        try:
+            request = await seerrs.get_request(request_id)
+            # only approved requests are processed
+            if request.get("status") != 2:
+                logger.info("Ignoring request that isn't approved")
+                return
+
+            logger.info("Processing request from webhook")
+            await rdbc.sync_torrents()
+            media_requests = await parse_request(
+                seerrs, jc, request, ignore_partials=False
+            )
+            async with anyio.create_task_group() as tg:
+                for mr in media_requests:
+                    dispatch_request(
+                        tg, mr, dl_repo, hash_repo, rdbc, tc, sync, rc, tracker
+                    )
+        except Exception:
+            # the periodic pass will try again, so don't take the receiver down
+            logger.exception("Unable to process request from webhook")
+        finally:
+            sync.release(request_id)
 
 
 async def clear_stalled_downloads(
@@ -295,9 +501,9 @@ async def clear_stalled_downloads(
 
     now = datetime.datetime.now(datetime.timezone.utc)
     limit_seconds = limit_hrs * 60 * 60
-    active_downloads = await rdbc.get_torrents(status=TorrentStatus.DOWNLOADING)
+    torrents = await rdbc.sync_torrents()
 
-    for download in active_downloads:
+    for download in torrents.with_status(ACTIVE_STATUSES):
         # update the timezone to be accurate...
         added_at = download["added"].strip("Z")
         dt = datetime.datetime.fromisoformat(added_at).replace(
@@ -324,10 +530,7 @@ async def clear_stalled_downloads(
         await rdbc.delete_magnet(download["id"])
 
     # Clear downloads that are in an error state
-    for download in await rdbc.get_torrents():
-        if download["status"] != "error":
-            continue
-
+    for download in torrents.with_status({"error"}):
         logger.info(
             "Deleting failed download", id=download["id"], hash=download["hash"]
         )
@@ -0,0 +1,110 @@
+import datetime
+from dataclasses import dataclass, field
+
+import structlog
+
+from jellbrid.config import Config
+from jellbrid.requests import MediaRequest
+from jellbrid.storage import RequestCursor, RequestCursorRepo
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class _Seen:
+    version: str
+    n_requests: int = 0
+    # the results of the handlers for the request's media requests
+    results: list[bool | None] = field(default_factory=list)
+    # whether any of its handlers was cut short
+    interrupted: bool = False
+
+
+class RequestTracker:
+    """
+    Remembers what happened to each seerr request, so that requests that
+    haven't changed since they were last processed can be skipped until their
+    backoff has passed. Nothing being found for a request doubles its backoff,
+    up to REQUEST_MAX_BACKOFF_S, while any change to the request or its media
+    has it processed again straight away.
+    """
+
+    def __init__(self, cfg: Config, repo: RequestCursorRepo):
+        self.cfg = cfg
+        self.repo = repo
+        self.cursors: dict[int, RequestCursor] = {}
+        self.seen: dict[int, _Seen] = {}
+
+    async def load(self):
+        """Reads the cursors for a new pass over the requests"""
+        self.cursors = await self.repo.get_all()
+        self.seen = {}
+
+    def should_skip(self, request_id: int, version: str) -> bool:
+        cursor = self.cursors.get(request_id)
+        if cursor is None or cursor.version != version:
+            return False
+        return cursor.in_backoff()
+
+    def parsed(self, request_id: int, version: str, n_requests: int):
+        self.seen[request_id] = _Seen(version=version, n_requests=n_requests)
+
+    def record(self, request: MediaRequest, result: bool | None):
+        """
+        Records a handler's result for a media request, which is True if it was
+        downloaded, False if nothing was found and None if it was skipped
+        """
+        if request.seerr_request_id is None:
+            return
+        seen = self.seen.get(request.seerr_request_id)
+        if seen is not None:
+            seen.results.append(result)
+
+    def interrupted(self, request: MediaRequest):
+        """Leaves a request's cursor as it was, when a handler couldn't finish"""
+        if request.seerr_request_id is None:
+            return
+        seen = self.seen.get(request.seerr_request_id)
+        if seen is not None:
+            seen.interrupted = True
+
+    async def save(self):
+        """Writes the outcome of every request processed during this pass"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cursors = []
+        for request_id, seen in self.seen.items():
+            if seen.n_requests == 0:
+                outcome = "nothing_to_do"
+            elif not seen.results or seen.interrupted:
+                # the handlers didn't finish, so try again next time
+                continue
+            elif any(r is not False for r in seen.results):
+                outcome = "found"
+            else:
+                outcome = "not_found"
+
+            attempts = 0
+            if outcome != "found":
+                # a change to the request starts its backoff over
+                previous = self.cursors.get(request_id)
+                attempts = 1
+                if previous is not None and previous.version == seen.version:
+                    attempts = previous.attempts + 1
+
+            backoff_s = min(
+                self.cfg.request_backoff_s * 2 ** max(0, attempts - 1),
+                self.cfg.request_max_backoff_s,
+            )
+            cursor = RequestCursor(
+                seerr_request_id=request_id,
+                version=seen.version,
+                outcome=outcome,
+                attempts=attempts,
+                next_attempt_at=now + datetime.timedelta(seconds=backoff_s),
+                processed_at=now,
+            )
+            self.cursors[request_id] = cursor
+            cursors.append(cursor)
+
+        await self.repo.put_many(cursors)
+        logger.info("Saved request cursors", processed=len(cursors))
@@ -1,19 +1,27 @@
-import typing as t
+import functools
 
 import anyio
 import structlog
 from anyio.streams.memory import MemoryObjectReceiveStream
 
+from jellbrid.clients.base import BaseClient
+from jellbrid.clients.hedged import HedgedClient
 from jellbrid.clients.jellyfin import JellyfinClient
 from jellbrid.clients.realdebrid import RealDebridClient
 from jellbrid.clients.seers import SeerrsClient
 from jellbrid.clients.torrentio import TorrentioClient
+from jellbrid.commands import Command, ProcessRequest
 from jellbrid.config import Config
 from jellbrid.logging import setup_logging
+from jellbrid.refresh import RefreshScheduler
 from jellbrid.requests import RequestCache
 from jellbrid.storage import (
     ActiveDownloadRepo,
     BadHashRepo,
+    RequestCursorRepo,
+    SeerrMetadataRepo,
+    TorrentFilesRepo,
+    TorrentioStreamsRepo,
     create_db,
     get_session_maker,
 )
@@ -21,51 +29,94 @@ from jellbrid.sync import Synchronizer
 from jellbrid.tasks import (
     clear_stalled_downloads,
     handle_requests,
+    handle_seerr_request,
     periodic_send,
     start_server,
     update_active_downloads,
+    update_media,
 )
+from jellbrid.tracker import RequestTracker
 
 logger = structlog.get_logger("jellbrid")
 
-Command = t.Literal["process", "update", "clear_stalled"]
-
 
 async def run_receiver(r_stream: MemoryObjectReceiveStream[Command]):
     cfg = Config()
     if cfg.dev_mode:
         logger.warning("Running in dev-mode. Nothing will be downloaded")
 
-    rdbc = RealDebridClient(cfg)
-    tc = TorrentioClient(cfg)
-    seerrs = SeerrsClient(cfg)
+    rdbc = RealDebridClient(cfg, files_repo=TorrentFilesRepo(get_session_maker()))
+    seerrs = SeerrsClient(cfg, metadata_repo=SeerrMetadataRepo(get_session_maker()))
     jc = JellyfinClient(cfg)
     dl_repo = ActiveDownloadRepo(get_session_maker())
     hash_repo = BadHashRepo(get_session_maker())
     sync = Synchronizer(cfg)
     rc = RequestCache()
+    tracker = RequestTracker(cfg, RequestCursorRepo(get_session_maker()))
 
-    async with anyio.create_task_group() as tg:
-        async with r_stream:
-            async for item in r_stream:
-                if item == "process":
-                    tg.start_soon(
-                        handle_requests,
-                        dl_repo,
-                        hash_repo,
-                        rdbc,
-                        seerrs,
-                        jc,
-                        tc,
-                        sync,
-                        rc,
-                    )
-                if item == "update":
-                    tg.start_soon(
-                        update_active_downloads, rdbc, dl_repo, sync, seerrs, jc
-                    )
-                if item == "clear_stalled":
-                    tg.start_soon(clear_stalled_downloads, rdbc, dl_repo, hash_repo, 3)
+    refresher = RefreshScheduler(cfg, functools.partial(update_media, jc, seerrs))
+
+    http_clients: list[BaseClient | HedgedClient] = [
+        rdbc.client,
+        seerrs.client,
+        jc.client,
+    ]
+    try:
+        # media is refreshed outside of the receiver's task group, so that a
+        # refresh doesn't hold up processing
+        async with refresher.running(), anyio.create_task_group() as tg:
+            tc = TorrentioClient(
+                cfg,
+                streams_repo=TorrentioStreamsRepo(get_session_maker()),
+                task_group=tg,
+            )
+            http_clients.append(tc.client)
+            # connect to the upstreams ahead of the first requests
+            for client in http_clients:
+                tg.start_soon(client.warmup)
+
+            async with r_stream:
+                async for item in r_stream:
+                    if item == "process":
+                        tg.start_soon(
+                            handle_requests,
+                            dl_repo,
+                            hash_repo,
+                            rdbc,
+                            seerrs,
+                            jc,
+                            tc,
+                            sync,
+                            rc,
+                            tracker,
+                            refresher,
+                        )
+                    if isinstance(item, ProcessRequest):
+                        tg.start_soon(
+                            handle_seerr_request,
+                            item.request_id,
+                            dl_repo,
+                            hash_repo,
+                            rdbc,
+                            seerrs,
+                            jc,
+                            tc,
+                            sync,
+                            rc,
+                            tracker,
+                        )
+                    if item == "update":
+                        tg.start_soon(
+                            update_active_downloads, rdbc, dl_repo, sync, refresher
+                        )
+                    if item == "clear_stalled":
+                        tg.start_soon(
+                            clear_stalled_downloads, rdbc, dl_repo, hash_repo, 3
+                        )
+    finally:
+        with anyio.CancelScope(shield=True):
+            for client in http_clients:
+                await client.aclose()
 
 
 async def runit(loop: bool = True):
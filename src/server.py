@@ -1,8 +1,9 @@
 import logging
 
 from hypercorn.config import Config as HypercornConfig
-from quart import Quart
+from quart import Quart, request
 
+from jellbrid.commands import Command, ProcessRequest
 from jellbrid.config import Config
 
 app = Quart(__name__)
@@ -10,7 +11,15 @@ app = Quart(__name__)
 
 @app.post("/")
 async def new_request_received():
-    await app.send_stream.send("process")  # type: ignore
+    # process just the request in the webhook's payload when there is one, and
+    # fall back to processing every request
+    payload = await request.get_json(force=True, silent=True) or {}
+    try:
+        command: Command = ProcessRequest(int(payload["request"]["request_id"]))
+    except (KeyError, TypeError, ValueError):
+        command = "process"
+
+    await app.send_stream.send(command)  # type: ignore
     return {"result": "ok"}
 
 
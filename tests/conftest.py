@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+# the settings Config requires, pointing at hosts that are never contacted
+os.environ.setdefault("RD_API_KEY", "rd-key")
+os.environ.setdefault("RD_API_URL", "https://api.rd.test/rest/1.0/")
+os.environ.setdefault("JF_API_KEY", "jf-key")
+os.environ.setdefault("JF_URL", "http://jellyfin.test")
+os.environ.setdefault("SEERR_API_KEY", "seerr-key")
+os.environ.setdefault("SEERR_URL", "http://seerr.test")
+os.environ.setdefault("TORRENTIO_URL", "http://primary.test,http://backup.test")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    from jellbrid.config import Config
+
+    # keeps the database out of the real home directory
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".config").mkdir()
+    return Config()
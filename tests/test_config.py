@@ -0,0 +1,21 @@
+import environs
+import pytest
+
+from jellbrid.config import url_list
+
+
+def test_url_list_normalises_each_url(monkeypatch):
+    monkeypatch.setenv(
+        "TORRENTIO_URL", " https://primary.test , https://backup.test/path//,"
+    )
+    assert url_list(environs.Env(), "TORRENTIO_URL") == [
+        "https://primary.test/",
+        "https://backup.test/path/",
+    ]
+
+
+@pytest.mark.parametrize("value", ["primary.test", "ftp://primary.test", " , "])
+def test_url_list_rejects_invalid_urls(monkeypatch, value):
+    monkeypatch.setenv("TORRENTIO_URL", value)
+    with pytest.raises(environs.EnvValidationError):
+        url_list(environs.Env(), "TORRENTIO_URL")
@@ -0,0 +1,88 @@
+import time
+
+import anyio
+import httpx
+import pytest
+
+from jellbrid.clients.base import BaseClient
+from jellbrid.clients.hedged import HedgedClient
+
+
+class Upstream:
+    """An upstream that answers after a delay, and records its requests"""
+
+    def __init__(self, name: str, delay_s: float):
+        self.name = name
+        self.delay_s = delay_s
+        self.started_at: list[float] = []
+        self.n_answered = 0
+        self.n_cancelled = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.started_at.append(time.perf_counter())
+        try:
+            await anyio.sleep(self.delay_s)
+        except anyio.get_cancelled_exc_class():
+            self.n_cancelled += 1
+            raise
+        self.n_answered += 1
+        return httpx.Response(200, json={"upstream": self.name})
+
+    def client(self) -> BaseClient:
+        client = BaseClient(f"http://{self.name}.test/")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        return client
+
+
+def hedged_client(*upstreams: Upstream, **kwargs) -> HedgedClient:
+    return HedgedClient([u.client() for u in upstreams], **kwargs)
+
+
+@pytest.mark.anyio
+async def test_slow_primary_is_hedged_after_the_percentile_delay():
+    primary = Upstream("primary", delay_s=5)
+    backup = Upstream("backup", delay_s=0)
+    # without enough latencies, the hedge would wait for the initial delay
+    client = hedged_client(primary, backup, percentile=0.95, initial_delay_s=5)
+    for _ in range(client.min_samples):
+        client.latency.record(0.2)
+
+    start = time.perf_counter()
+    response = await client.request("GET", "stream.json")
+
+    assert response == {"upstream": "backup"}
+    hedged_after_s = backup.started_at[0] - start
+    assert 0.2 <= hedged_after_s < 1
+    assert client.n_hedged == 1
+    assert client.wins == [0, 1]
+
+
+@pytest.mark.anyio
+async def test_hedge_cancels_the_losing_request():
+    primary = Upstream("primary", delay_s=5)
+    backup = Upstream("backup", delay_s=0.05)
+    client = hedged_client(primary, backup, initial_delay_s=0.05)
+
+    start = time.perf_counter()
+    response = await client.request("GET", "stream.json")
+
+    assert response == {"upstream": "backup"}
+    assert time.perf_counter() - start < 1
+    # exactly one response, and the primary's request didn't carry on
+    assert (primary.n_answered, backup.n_answered) == (0, 1)
+    assert primary.n_cancelled == 1
+    # the cancelled primary's latency still counts towards the percentile
+    assert len(client.latency.latencies) == 1
+
+
+@pytest.mark.anyio
+async def test_fast_primary_is_not_hedged():
+    primary = Upstream("primary", delay_s=0)
+    backup = Upstream("backup", delay_s=0)
+    client = hedged_client(primary, backup, initial_delay_s=0.5)
+
+    response = await client.request("GET", "stream.json")
+
+    assert response == {"upstream": "primary"}
+    assert backup.started_at == []
+    assert client.n_hedged == 0
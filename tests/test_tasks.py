@@ -0,0 +1,64 @@
+import anyio
+import pytest
+
+from jellbrid.clients.circuitbreaker import CircuitBreaker
+from jellbrid.requests import MovieRequest
+from jellbrid.tasks import track_request
+from jellbrid.tracker import RequestTracker
+
+
+class FakeCursorRepo:
+    def __init__(self):
+        self.saved = []
+
+    async def get_all(self):
+        return {}
+
+    async def put_many(self, cursors):
+        self.saved.extend(cursors)
+
+
+def movie(request_id: int) -> MovieRequest:
+    return MovieRequest(
+        title=f"Movie {request_id}",
+        imdb_id=f"tt{request_id}",
+        tmdb_id=request_id,
+        release_date="2020-01-01",
+        seerr_request_id=request_id,
+    )
+
+
+@pytest.mark.anyio
+async def test_open_circuit_in_a_task_group_only_skips_its_request(cfg):
+    repo = FakeCursorRepo()
+    tracker = RequestTracker(cfg, repo)
+    await tracker.load()
+    tracker.parsed(1, "v1", 1)
+    tracker.parsed(2, "v1", 1)
+
+    breaker = CircuitBreaker("api.rd.test", failure_threshold=1)
+    breaker.record_failure()
+
+    async def lookup():
+        breaker.before_request()
+
+    async def unavailable_handler(request):
+        # like the per-chunk availability lookups and the probe workers
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(lookup)
+            tg.start_soon(anyio.sleep, 1)
+        return True
+
+    async def handler(request):
+        await anyio.sleep(0.01)
+        return True
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(track_request, tracker, unavailable_handler, movie(1))
+        tg.start_soon(track_request, tracker, handler, movie(2))
+
+    assert tracker.seen[1].interrupted
+    assert tracker.seen[2].results == [True]
+
+    await tracker.save()
+    assert [c.seerr_request_id for c in repo.saved] == [2]
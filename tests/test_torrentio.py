@@ -0,0 +1,55 @@
+import httpx
+import pytest
+
+from jellbrid.clients.torrentio import TorrentioClient
+from jellbrid.clients.torrentio.services import get_streams_for_season
+from jellbrid.requests import EpisodeRequest
+
+
+def episodes(n: int) -> list[EpisodeRequest]:
+    return [
+        EpisodeRequest(
+            title="Show",
+            imdb_id="tt1",
+            tmdb_id=1,
+            release_date="2020-01-01",
+            season_id=1,
+            episode_id=i,
+            episode_name=f"Episode {i}",
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def stream(info_hash: str) -> dict:
+    return {"infoHash": info_hash, "title": info_hash, "name": "Torrentio"}
+
+
+@pytest.mark.anyio
+async def test_season_listing_without_streams_counts_as_empty(cfg):
+    tc = TorrentioClient(cfg)
+
+    async def request(method, path, *args, **kwargs):
+        if ":01:01" in path:
+            return {"streams": [stream("a")]}
+        # a response without any listing at all
+        return {}
+
+    tc.client.request = request
+    season = await get_streams_for_season(tc, episodes(2))
+    assert season.episodes == {1: ["a"], 2: []}
+
+
+@pytest.mark.anyio
+async def test_season_listing_fails_while_torrentio_is_down(cfg):
+    tc = TorrentioClient(cfg)
+
+    async def request(method, path, *args, **kwargs):
+        if ":01:01" in path:
+            return {"streams": [stream("a")]}
+        raise httpx.ConnectError("connection refused")
+
+    tc.client.request = request
+    with pytest.raises(ExceptionGroup) as excinfo:
+        await get_streams_for_season(tc, episodes(2))
+    assert excinfo.group_contains(httpx.ConnectError)